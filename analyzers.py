@@ -1,5 +1,6 @@
 import os
 import re
+import mmap
 from config import (
     BINARY_EXTENSIONS,
     IGNORED_NAMES,
@@ -9,177 +10,358 @@ from config import (
     IGNORED_KEYWORDS
 )
 import logging
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+
+try:
+    # Optional: RE2 matches in linear time without backtracking
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    # Optional: Aho-Corasick matches every purpose keyword in one pass
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+def _compile_linear(pattern, flags=0):
+    """Compile a pattern with RE2 when available, falling back to stdlib re.
+
+    RE2 rejects lookarounds and backreferences; such patterns stay on re.
+    """
+    if re2 is not None:
+        inline = ''.join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+        prefix = f'(?{inline})' if inline else ''
+        if isinstance(pattern, bytes):
+            prefix = prefix.encode('ascii')
+        try:
+            return re2.compile(prefix + pattern)
+        except Exception as e:
+            logging.debug(f"RE2 rejected pattern, using re instead: {e}")
+    return re.compile(pattern, flags)
+
+def _compile_function_patterns(compile_pattern, encode=False):
+    """Compile FUNCTION_PATTERNS once, dropping any pattern that fails to compile."""
+    compiled = []
+    for pattern_name, pattern in FUNCTION_PATTERNS.items():
+        try:
+            compiled.append((pattern_name, compile_pattern(pattern.encode('utf-8') if encode else pattern, re.MULTILINE)))
+        except re.error as e:
+            logging.debug(f"Invalid regex pattern {pattern_name}: {e}")
+    return compiled
+
+# Function detection patterns, compiled once at import
+_COMPILED_FUNCTION_PATTERNS = _compile_function_patterns(re.compile)
+
+# RE2 forms where available. RE2's \w only matches ASCII, so these are used on
+# ASCII-only text and on bytes (where re's \w is ASCII-only as well)
+_LINEAR_FUNCTION_PATTERNS = _compile_function_patterns(_compile_linear)
+
+# Bytes form of the same patterns, used on memory-mapped large files
+_COMPILED_FUNCTION_PATTERNS_BYTES = _compile_function_patterns(_compile_linear, encode=True)
+
+# Files larger than this are scanned through mmap instead of being read whole
+_MMAP_THRESHOLD = 256 * 1024
+_MMAP_CHUNK = 1024 * 1024
+
+# Case-folded keywords that are never reported as function names
+_IGNORED_LOWER = frozenset(keyword.lower() for keyword in IGNORED_KEYWORDS)
+
+# Extensions skipped outright: binary files and documentation/text files
+_SKIPPED_EXTENSIONS = frozenset(BINARY_EXTENSIONS | NON_CODE_EXTENSIONS)
+
+# Extensions analyzed for functions; a skip listing takes precedence
+_ANALYZED_EXTENSIONS = frozenset(CODE_EXTENSIONS - _SKIPPED_EXTENSIONS)
 
 def is_binary_file(filename):
     """Check if a file is binary or non-code based on its extension."""
-    ext = os.path.splitext(filename)[1].lower()
-    
-    # Binary extensions
-    if ext in BINARY_EXTENSIONS:
-        return True
-        
-    # Documentation and text files that shouldn't be analyzed for functions
-    return ext in NON_CODE_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in _SKIPPED_EXTENSIONS
 
 def should_ignore_file(name):
     """Check if a file or directory should be ignored."""
     return name in IGNORED_NAMES or name.startswith('.')
 
+def _count_lines(buffer):
+    """Count lines as splitlines() does for \\n, \\r\\n and lone \\r endings, without splitting.
+
+    Works on bytes and on a memory map alike, so both scan paths report the
+    same count; the buffer is read in bounded slices. A trailing partial line
+    counts as one.
+    """
+    size = len(buffer)
+    breaks = 0
+    for start in range(0, size, _MMAP_CHUNK):
+        # One byte of overlap so a \r\n split across two slices still counts once
+        piece = buffer[start:start + _MMAP_CHUNK + 1]
+        breaks += piece.count(b'\n', 0, _MMAP_CHUNK) + piece.count(b'\r', 0, _MMAP_CHUNK) - piece.count(b'\r\n')
+    last = buffer[size - 1:size]
+    return breaks + (1 if last and last not in (b'\n', b'\r') else 0)
+
+def _find_functions(buffer, patterns):
+    """Collect detected function names from a str or bytes buffer."""
+    functions = []
+    for pattern_name, pattern in patterns:
+        for match in pattern.finditer(buffer):
+            # Each pattern's capture groups are alternatives; the last closed group is the name
+            func_name = match.group(match.lastindex) if match.lastindex else None
+            if not func_name:
+                continue
+            if isinstance(func_name, bytes):
+                func_name = func_name.decode('utf-8', 'ignore')
+            if func_name in _IGNORED_LOWER:
+                continue
+            # Only pay for lower() when the name has uppercase characters
+            if not func_name.islower() and func_name.lower() in _IGNORED_LOWER:
+                continue
+            functions.append((func_name, "Function detected"))
+    return functions
+
+def _analyze_mapped_file(file_path):
+    """Analyze a large file through a read-only memory map instead of decoding it whole."""
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if b'\x00' in mm[:4096]:
+            return [], 0
+        return _find_functions(mm, _COMPILED_FUNCTION_PATTERNS_BYTES), _count_lines(mm)
+
+@lru_cache(maxsize=4096)
+def _analyze_file_cached(file_path, mtime_ns, size):
+    """Scan a code file; keyed on mtime and size so edits invalidate the entry."""
+    if size > _MMAP_THRESHOLD:
+        return _analyze_mapped_file(file_path)
+        
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+        
+    # A NUL byte near the start means a binary file slipped past the extension filter
+    if b'\x00' in raw[:4096]:
+        return [], 0
+    content = raw.decode('utf-8', 'ignore')
+        
+    # Use patterns for function detection; the RE2 forms only on pure-ASCII text
+    patterns = _LINEAR_FUNCTION_PATTERNS if raw.isascii() else _COMPILED_FUNCTION_PATTERNS
+    functions = _find_functions(content, patterns)
+    
+    return functions, _count_lines(raw)
+
 def analyze_file_content(file_path):
     """Analyze file content for functions and their descriptions."""
     try:
-        # Skip binary and non-code files
-        if is_binary_file(file_path):
-            return [], 0
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Skip files that don't look like actual code files
+        # Skip binary, non-code and unknown files before opening them
         ext = os.path.splitext(file_path)[1].lower()
-        if ext not in CODE_EXTENSIONS:
+        if ext not in _ANALYZED_EXTENSIONS:
             return [], 0
             
-        functions = []
-        
-        # Use patterns for function detection
-        for pattern_name, pattern in FUNCTION_PATTERNS.items():
-            try:
-                matches = re.finditer(pattern, content, re.MULTILINE | re.DOTALL)
-                for match in matches:
-                    func_name = next(filter(None, match.groups()), None)
-                    if not func_name or func_name.lower() in IGNORED_KEYWORDS:
-                        continue
-                    functions.append((func_name, "Function detected"))
-            except re.error as e:
-                logging.debug(f"Invalid regex pattern {pattern_name} for {file_path}: {e}")
-                continue
-            except Exception as e:
-                logging.debug(f"Error analyzing pattern {pattern_name} for {file_path}: {e}")
-                continue
-        
-        return functions, len(content.split('\n'))
+        # Unchanged files are served from the in-memory cache
+        stat = os.stat(file_path)
+        functions, line_count = _analyze_file_cached(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        return list(functions), line_count
     except Exception as e:
         print(f"Error analyzing file {file_path}: {e}")
         return [], 0 
 
+# 每个模式匹配时必然出现的字面子串；内容中一个都不包含时直接跳过正则扫描
+_PREFILTER = {
+    ('common', 'interface'): ('interface',),
+    ('common', 'jsx_component'): ('<',),
+    ('common', 'react_hook'): ('use',),
+    ('common', 'next_api'): ('getStaticProps', 'getStaticPaths', 'getServerSideProps'),
+    ('common', 'styled_component'): ('styled',),
+    ('unity', 'component'): ('MonoBehaviour', 'ScriptableObject', 'EditorWindow'),
+    # 几乎每个 C# 文件都有 void 和 [，改用方法名和特性名预检才能真正跳过正则
+    ('unity', 'lifecycle'): (
+        'Awake', 'Start', 'Update', 'OnEnable', 'OnDisable', 'OnDestroy',
+        'OnTrigger', 'OnCollision', 'OnMouse', 'OnGUI'
+    ),
+    ('unity', 'attribute'): (
+        'SerializeField', 'Header', 'Tooltip', 'Range', 'RequireComponent',
+        'ExecuteInEditMode', 'CreateAssetMenu', 'MenuItem'
+    ),
+    ('unity', 'type'): (
+        'GameObject', 'Transform', 'Rigidbody', 'Collider', 'AudioSource', 'Camera',
+        'Light', 'Animator', 'ParticleSystem', 'Canvas', 'Image', 'Text', 'Button',
+        'Vector', 'Quaternion'
+    ),
+    ('unity', 'event'): ('UnityEvent',),
+    ('unity', 'field'): (';',),
+}
+
+def _finditer(compiled_patterns: Dict[str, Any], group: str, name: str, content: str):
+    """先做子串预检，命中后才运行对应的正则"""
+    needles = _PREFILTER.get((group, name))
+    if needles is not None and not any(needle in content for needle in needles):
+        return ()
+    return compiled_patterns[group][name].finditer(content)
+
 def analyze_web_patterns(content: str, rel_path: str, structure: Dict[str, Any], compiled_patterns: Dict[str, Any]) -> None:
     """分析 React/Next.js 特定模式"""
+    patterns = structure['patterns']
+    class_patterns = patterns['class_patterns']
+    function_patterns = patterns['function_patterns']
+    code_organization = patterns['code_organization']
+
     # 查找接口和类型
-    for match in compiled_patterns['common']['interface'].finditer(content):
-        structure['patterns']['class_patterns'].append({
-            'name': match.group(1),
-            'type': 'interface/type',
-            'inheritance': match.group(2).strip() if match.group(2) else '',
-            'file': rel_path
-        })
-
-    # 查找 React 组件
-    for match in compiled_patterns['common']['jsx_component'].finditer(content):
-        component_name = match.group(1)
-        if component_name[0].isupper():  # React 组件以大写字母开头
-            structure['patterns']['class_patterns'].append({
-                'name': component_name,
-                'type': 'react_component',
-                'file': rel_path
-            })
+    class_patterns.extend({
+        'name': match.group(1),
+        'type': 'interface/type',
+        'inheritance': match.group(2).strip() if match.group(2) else '',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'common', 'interface', content))
+
+    # 查找 React 组件（React 组件以大写字母开头）
+    class_patterns.extend({
+        'name': match.group(1),
+        'type': 'react_component',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'common', 'jsx_component', content)
+        if match.group(1)[0].isupper())
 
     # 查找 React hooks
-    for hook in re.finditer(compiled_patterns['common']['react_hook'], content):
-        structure['patterns']['function_patterns'].append({
-            'name': hook.group(0),
-            'type': 'react_hook',
-            'file': rel_path
-        })
+    function_patterns.extend({
+        'name': hook.group(0),
+        'type': 'react_hook',
+        'file': rel_path
+    } for hook in _finditer(compiled_patterns, 'common', 'react_hook', content))
 
     # 查找 Next.js 特定模式
     if any(x in rel_path for x in ['pages/', 'app/']):
         # 检查 Next.js 数据获取方法
-        for method in re.finditer(compiled_patterns['common']['next_api'], content):
-            structure['patterns']['function_patterns'].append({
-                'name': method.group(0),
-                'type': 'next_data_fetching',
-                'file': rel_path
-            })
+        function_patterns.extend({
+            'name': method.group(0),
+            'type': 'next_data_fetching',
+            'file': rel_path
+        } for method in _finditer(compiled_patterns, 'common', 'next_api', content))
 
         # 分析页面/路由结构
-        page_match = re.search(compiled_patterns['common']['next_page'], rel_path)
+        page_match = compiled_patterns['common']['next_page'].search(rel_path)
         if page_match:
-            structure['patterns']['code_organization'].append({
+            # next_page 模式没有命名组：路由取 pages/ 或 app/ 之后、扩展名之前的部分
+            route = page_match.group(0).split('/', 1)[1].rsplit('.', 1)[0]
+            code_organization.append({
                 'type': 'next_page',
-                'route': page_match.group('route'),
-                'nested': page_match.group('nested'),
+                'route': route,
+                'nested': '/' in route,
                 'file': rel_path
             })
 
         # 检查布局文件
-        if re.search(compiled_patterns['common']['next_layout'], rel_path):
-            structure['patterns']['code_organization'].append({
+        if compiled_patterns['common']['next_layout'].search(rel_path):
+            code_organization.append({
                 'type': 'next_layout',
                 'file': rel_path
             })
 
     # 查找 styled-components 模式
-    for match in re.finditer(compiled_patterns['common']['styled_component'], content):
-        structure['patterns']['code_organization'].append({
-            'type': 'styled_component',
-            'element': match.group('element') if match.group('element') else 'css',
-            'file': rel_path
-        })
+    code_organization.extend({
+        'type': 'styled_component',
+        'element': match.group('element') if match.group('element') else 'css',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'common', 'styled_component', content))
 
 def analyze_unity_patterns(content: str, rel_path: str, structure: Dict[str, Any], compiled_patterns: Dict[str, Any]) -> None:
     """分析 Unity 特定模式"""
+    patterns = structure['patterns']
+    class_patterns = patterns['class_patterns']
+    function_patterns = patterns['function_patterns']
+    code_organization = patterns['code_organization']
+
     # 查找 MonoBehaviour 和 ScriptableObject 组件
-    for match in compiled_patterns['unity']['component'].finditer(content):
-        structure['patterns']['class_patterns'].append({
-            'name': match.group(0),
-            'type': 'unity_component',
-            'file': rel_path
-        })
+    class_patterns.extend({
+        'name': match.group(0),
+        'type': 'unity_component',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'unity', 'component', content))
 
     # 查找 Unity 生命周期方法
-    for match in compiled_patterns['unity']['lifecycle'].finditer(content):
-        structure['patterns']['function_patterns'].append({
-            'name': match.group(0),
-            'type': 'unity_lifecycle',
-            'file': rel_path
-        })
+    function_patterns.extend({
+        'name': match.group(0),
+        'type': 'unity_lifecycle',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'unity', 'lifecycle', content))
 
     # 查找 Unity 属性
-    for match in compiled_patterns['unity']['attribute'].finditer(content):
-        structure['patterns']['code_organization'].append({
-            'type': 'unity_attribute',
-            'name': match.group(0),
-            'parameters': match.group('params') if match.group('params') else '',
-            'file': rel_path
-        })
+    code_organization.extend({
+        'type': 'unity_attribute',
+        'name': match.group(0),
+        'parameters': match.group('params') if match.group('params') else '',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'unity', 'attribute', content))
 
     # 查找 Unity 类型
-    for match in compiled_patterns['unity']['type'].finditer(content):
-        structure['patterns']['class_patterns'].append({
-            'name': match.group(0),
-            'type': 'unity_type',
-            'file': rel_path
-        })
+    class_patterns.extend({
+        'name': match.group(0),
+        'type': 'unity_type',
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'unity', 'type', content))
 
     # 查找 Unity 事件
-    for match in compiled_patterns['unity']['event'].finditer(content):
-        structure['patterns']['code_organization'].append({
-            'type': 'unity_event',
-            'event_type': match.group('type'),
-            'name': match.group('name'),
-            'file': rel_path
-        })
+    code_organization.extend({
+        'type': 'unity_event',
+        # patterns_analyzer 的事件模式同样把名称组命名为 n，按位置取组
+        'event_type': match.group(1),
+        'name': match.group(2),
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'unity', 'event', content))
 
     # 查找 Unity 序列化字段
-    for match in compiled_patterns['unity']['field'].finditer(content):
-        structure['patterns']['code_organization'].append({
-            'type': 'unity_field',
-            'field_type': match.group('type'),
-            'name': match.group('name'),
-            'file': rel_path
-        })
+    code_organization.extend({
+        'type': 'unity_field',
+        # patterns_analyzer 的字段模式把名称组命名为 n，按位置取组对两套模式都成立
+        'field_type': match.group(1),
+        'name': match.group(2),
+        'file': rel_path
+    } for match in _finditer(compiled_patterns, 'unity', 'field', content))
+
+# 目录用途分类，各关键字组按顺序对应一个用途
+_PURPOSE_KEYWORDS = (
+    ('testing', ('test', 'spec', 'mock')),
+    ('utilities', ('util', 'helper', 'common', 'shared')),
+    ('domain', ('model', 'entity', 'domain')),
+    ('business_logic', ('controller', 'handler', 'service')),
+    ('presentation', ('view', 'template', 'component')),
+)
+
+# 零宽前瞻，使重叠的关键字也能全部命中
+_PURPOSE_RE = re.compile('(?=' + '|'.join(
+    f"(?P<{purpose}>{'|'.join(keywords)})" for purpose, keywords in _PURPOSE_KEYWORDS
+) + ')')
+
+def _build_purpose_automaton():
+    """构建关键字 -> 用途的 Aho-Corasick 自动机；未安装 pyahocorasick 时返回 None"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for purpose, keywords in _PURPOSE_KEYWORDS:
+        for keyword in keywords:
+            automaton.add_word(keyword, purpose)
+    automaton.make_automaton()
+    return automaton
+
+_PURPOSE_AUTOMATON = _build_purpose_automaton()
+
+@lru_cache(maxsize=4096)
+def _classify_dir_name(dir_name: str) -> Tuple[str, Tuple[str, ...]]:
+    """返回目录名的命名约定和用途；同名目录在项目中反复出现，结果会被缓存"""
+    if dir_name.islower():
+        pattern = 'lowercase'
+    elif dir_name.isupper():
+        pattern = 'uppercase'
+    elif '_' in dir_name:
+        pattern = 'snake_case'
+    elif '-' in dir_name:
+        pattern = 'kebab-case'
+    else:
+        pattern = 'mixed'
+        
+    lowered = dir_name.lower()
+    if _PURPOSE_AUTOMATON is not None:
+        found = {purpose for _, purpose in _PURPOSE_AUTOMATON.iter(lowered)}
+    else:
+        found = {match.lastgroup for match in _PURPOSE_RE.finditer(lowered)}
+    purpose = tuple(name for name, _ in _PURPOSE_KEYWORDS if name in found)
+    return pattern, purpose
 
 def analyze_directory_patterns(structure: Dict[str, Any], dir_stats: Dict[str, Any]) -> None:
     """分析目录组织模式"""
@@ -187,37 +369,14 @@ def analyze_directory_patterns(structure: Dict[str, Any], dir_stats: Dict[str, A
         if not dir_path:  # 跳过根目录
             continue
             
-        # 分析目录命名约定
-        dir_name = os.path.basename(dir_path)
-        if dir_name.islower():
-            pattern = 'lowercase'
-        elif dir_name.isupper():
-            pattern = 'uppercase'
-        elif '_' in dir_name:
-            pattern = 'snake_case'
-        elif '-' in dir_name:
-            pattern = 'kebab-case'
-        else:
-            pattern = 'mixed'
-            
-        # 分析目录用途
-        purpose = []
-        if any(x in dir_name.lower() for x in ['test', 'spec', 'mock']):
-            purpose.append('testing')
-        if any(x in dir_name.lower() for x in ['util', 'helper', 'common', 'shared']):
-            purpose.append('utilities')
-        if any(x in dir_name.lower() for x in ['model', 'entity', 'domain']):
-            purpose.append('domain')
-        if any(x in dir_name.lower() for x in ['controller', 'handler', 'service']):
-            purpose.append('business_logic')
-        if any(x in dir_name.lower() for x in ['view', 'template', 'component']):
-            purpose.append('presentation')
+        # 分析目录命名约定和用途
+        pattern, purpose = _classify_dir_name(os.path.basename(dir_path))
             
         # 添加目录模式
         structure['patterns']['directory_patterns'].append({
             'path': dir_path,
             'name_pattern': pattern,
-            'purpose': purpose,
+            'purpose': list(purpose),
             'languages': stats['languages'],
             'total_files': stats['total_files'],
             'code_files': stats['code_files'],
@@ -157,8 +157,8 @@ CODE_EXTENSIONS = {
 # Regex patterns for function detection
 FUNCTION_PATTERNS = {
     # Python
-    'python_function': r'def\s+([a-zA-Z_]\w*)\s*\(',
-    'python_class': r'class\s+([a-zA-Z_]\w*)\s*[:\(]',
+    'python_function': r'^[ \t]*(?:async[ \t]+)?def\s+([a-zA-Z_]\w*)\s*\(',
+    'python_class': r'^[ \t]*class\s+([a-zA-Z_]\w*)\s*[:\(]',
     
     # JavaScript/TypeScript
     'js_function': r'(?:^|\s+)(?:function\s+([a-zA-Z_]\w*)|(?:const|let|var)\s+([a-zA-Z_]\w*)\s*=\s*(?:async\s*)?function)',
@@ -183,16 +183,16 @@ FUNCTION_PATTERNS = {
 }
 
 # Keywords that should not be treated as function names
-IGNORED_KEYWORDS = {
+IGNORED_KEYWORDS = frozenset({
     'if', 'switch', 'while', 'for', 'catch', 'finally', 'else', 'return',
     'break', 'continue', 'case', 'default', 'to', 'from', 'import', 'as',
     'try', 'except', 'raise', 'with', 'async', 'await', 'yield', 'assert',
     'pass', 'del', 'print', 'in', 'is', 'not', 'and', 'or', 'lambda',
     'global', 'nonlocal', 'class', 'def'
-}
+})
 
 # Names of files and directories that should be ignored
-IGNORED_NAMES = set(_config.get('ignored_directories', []))
+IGNORED_NAMES = frozenset(_config.get('ignored_directories', []))
 
 FILE_LENGTH_STANDARDS = _config.get('file_length_standards', {})
 
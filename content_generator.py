@@ -5,14 +5,10 @@ from project_detector import detect_project_type, get_project_description, get_f
 from config import (
     get_file_length_limit, 
     load_config, 
-    FUNCTION_PATTERNS,
-    IGNORED_KEYWORDS,
     CODE_EXTENSIONS,
     NON_CODE_EXTENSIONS
 )
-import re
-import logging
-from typing import Dict, List, Tuple, Set
+from typing import Dict, List, Set
 
 class ProjectMetrics:
     def __init__(self):
@@ -168,42 +164,3 @@ def generate_focus_content(project_path: str, config: Dict) -> str:
     ])
     
     return '\n'.join(content)
-
-def analyze_file_content(file_path: str) -> Tuple[List[Tuple[str, str]], int]:
-    """Analyze file content for functions and metrics."""
-    try:
-        # Skip binary and non-code files
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in CODE_EXTENSIONS:
-            return [], 0
-            
-        # Skip binary files
-        if is_binary_file(file_path):
-            return [], 0
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        functions = []
-        for pattern_name, pattern in FUNCTION_PATTERNS.items():
-            try:
-                matches = re.finditer(pattern, content)
-                for match in matches:
-                    func_name = next(filter(None, match.groups()), None)
-                    if func_name and func_name not in IGNORED_KEYWORDS:
-                        functions.append((func_name, "Function detected"))
-            except re.error as e:
-                logging.debug(f"Invalid regex pattern {pattern_name} for {file_path}: {e}")
-                continue
-            except Exception as e:
-                logging.debug(f"Error analyzing pattern {pattern_name} for {file_path}: {e}")
-                continue
-                
-        return functions, len(content.splitlines())
-        
-    except UnicodeDecodeError:
-        logging.debug(f"Unable to read {file_path} as text file")
-        return [], 0
-    except Exception as e:
-        logging.debug(f"Error analyzing file {file_path}: {e}")
-        return [], 0 
\ No newline at end of file
@@ -2,18 +2,212 @@
 包含用于生成 AI 规则的 prompt 模板
 """
 
+from functools import lru_cache
+from itertools import islice
+
+try:
+    # 可选：tiktoken 在本地计算 token 数，不必为预估 prompt 大小额外请求 API
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 参与模块分析的源代码扩展名
+CODE_EXTS = ('.py', '.js', '.ts', '.tsx', '.kt', '.php', '.swift', '.cpp', '.c', '.h', '.hpp', '.cs', '.csx')
+
+# 构建系统相关的文件名
+BUILD_FILES = frozenset({
+    'setup.py', 'requirements.txt', 'package.json', 'Makefile', 'composer.json',
+    'Gemfile', 'CMakeLists.txt', 'build.gradle', 'pom.xml', 'webpack.config.js'
+})
+
+# prompt 模板的版本号；修改 prompt 模板时递增，使沿用旧规则文件的生成摘要失效
+PROMPT_VERSION = 2
+
+# 每个代码样本在 prompt 中保留的最大字符数
+CODE_SAMPLE_CHARS = 10000
+
+# 所有代码样本合计的 token 预算，超出后不再追加样本
+CODE_SAMPLE_TOKEN_BUDGET = 40000
+
+# 没有可用的 tiktoken 编码表时按平均每个 token 约 4 个字符估算
+_CHARS_PER_TOKEN = 4
+
+# 除构建文件外，每类在 prompt 中最多列出的文件数
+_BUCKET_LIMIT = 5
+
+# 项目描述分析中逐个列出的核心模块数上限；其余模块只计入总数
+_CORE_MODULE_LIMIT = 30
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    """加载 tiktoken 编码表，只加载一次；未安装 tiktoken 或编码表无法加载时返回 None
+
+    编码表在首次使用时从网络下载，离线或下载失败时退回按字符数估算
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️ 无法加载 tiktoken 编码表，改为按字符数估算 token: {e}")
+        return None
+
+def count_tokens(text):
+    """
+    在本地估算文本的 token 数
+
+    cl100k_base 与 Gemini 的分词并不完全一致，但用于控制 prompt 大小已经足够
+
+    Args:
+        text (str): 待估算的文本
+
+    Returns:
+        int: token 数
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _truncate_to_tokens(text, max_tokens):
+    """
+    把文本截断到不超过 max_tokens 个 token
+
+    Args:
+        text (str): 待截断的文本
+        max_tokens (int): token 上限
+
+    Returns:
+        Tuple[str, int]: 截断后的文本及其 token 数
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        text = text[:max_tokens * _CHARS_PER_TOKEN]
+        return text, count_tokens(text)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+def _classify_files(files):
+    """
+    单次遍历文件列表，把每个文件分到 prompt 各段落对应的分组中
+
+    Args:
+        files (List[str]): 项目中的文件相对路径
+
+    Returns:
+        Dict[str, List[str]]: 分组名到文件列表的映射
+    """
+    buckets = {
+        'project': [],
+        'ide': [],
+        'build': [],
+        'core': [],
+        'code': [],
+        'support': [],
+        'templates': [],
+        'python_core': [],
+    }
+    project, ide, build, core, code, support, templates, python_core = buckets.values()
+    for f in files:
+        lower = f.lower()
+        if len(project) < _BUCKET_LIMIT and f.endswith(('.json', '.md', '.env', '.gitignore')):
+            project.append(f)
+        if len(ide) < _BUCKET_LIMIT and ('.vscode' in f or '.idea' in f):
+            ide.append(f)
+        if f in BUILD_FILES:
+            build.append(f)
+        if f.endswith(CODE_EXTS):
+            if len(code) < _BUCKET_LIMIT:
+                code.append(f)
+            if len(core) < _BUCKET_LIMIT and not any(x in lower for x in ['setup', 'config']):
+                core.append(f)
+        if len(support) < _BUCKET_LIMIT and any(x in lower for x in ['util', 'helper', 'common', 'shared']):
+            support.append(f)
+        if len(templates) < _BUCKET_LIMIT and 'template' in lower:
+            templates.append(f)
+        # 项目描述分析列出全部核心 Python 模块，不受数量限制
+        if f.endswith('.py') and not any(x in lower for x in ['setup', 'config', 'test']):
+            python_core.append(f)
+    return buckets
+
+def _description_section(project_structure, python_core):
+    """
+    生成 prompt 中用于撰写项目描述的分析段落
+
+    Args:
+        project_structure (Dict[str, Any]): 项目结构分析结果
+        python_core (List[str]): 核心 Python 模块（不含 setup、config、test）
+
+    Returns:
+        str: 项目描述分析段落
+    """
+    patterns = project_structure['patterns']
+    index = project_structure['index']
+    core_modules = [{
+        'name': file,
+        'classes': index['classes_by_file'].get(file, ()),
+        'functions': index['functions_by_file'].get(file, ())
+    } for file in python_core]
+    # 大项目的核心模块可达上千个，只列出定义最多的模块；排序稳定，定义数相同时保持原有顺序
+    listed = sorted(core_modules, key=lambda m: len(m['classes']) + len(m['functions']), reverse=True)[:_CORE_MODULE_LIMIT]
+    # 各列表先拼好再放入模板，不在 f-string 中嵌套 chr(10).join
+    module_counts = "\n".join(
+        f"- {m['name']}: {len(m['classes'])} classes, {len(m['functions'])} functions" for m in listed
+    )
+    module_purposes = "\n".join(
+        f"- {m['name']}: Main purpose indicated by {', '.join(c['name'] for c in m['classes'][:2])}"
+        for m in listed if m['classes']
+    )
+
+    return f"""Project Description Analysis:
+1. Core Modules Analysis:
+{module_counts}
+
+2. Module Responsibilities:
+{module_purposes}
+
+3. Technical Implementation:
+- Error Handling: {len(patterns.get('error_patterns', []))} patterns found
+- Performance Optimizations: {len(patterns.get('performance_patterns', []))} patterns found
+- Code Organization: {len(patterns.get('code_organization', []))} patterns found
+
+4. Project Architecture:
+- Total Files: {len(project_structure.get('files', []))}
+- Core Python Modules: {len(core_modules)}
+- External Dependencies: {len(project_structure.get('dependencies', {}))}
+
+Based on this analysis, also write a detailed project description (2-3 sentences) that captures its essence and covers:
+1. The project's main purpose and functionality
+2. Key technical features and implementation approach
+3. Target users and primary use cases
+4. Unique characteristics or innovations
+
+Focus on what makes this project unique. Do not include technical metrics in the description."""
+
 def get_ai_rules_prompt(project_info, project_structure):
     """
     生成用于 AI 规则分析的 prompt
-    
+
     Args:
         project_info (Dict[str, Any]): 项目信息
         project_structure (Dict[str, Any]): 项目结构分析结果
-        
+
     Returns:
         str: 格式化的 prompt
     """
-    prompt = f"""As an AI assistant working in Cursor IDE, analyze this project to understand how you should behave and generate code that perfectly matches the project's patterns and standards.
+    files = project_structure['files']
+    patterns = project_structure['patterns']
+    dependencies = project_structure['dependencies']
+    buckets = _classify_files(files)
+    functions_by_file = project_structure['index']['functions_by_file']
+    # 导入可能是列表或以模块名为键的 Counter，统一去重后再做子串匹配
+    unique_imports = set(patterns['imports'])
+
+    # 各段落依次追加到 parts，最后一次性 join，避免反复拼接大字符串
+    parts = []
+    parts.append(f"""As an AI assistant working in Cursor IDE, analyze this project to understand how you should behave and generate code that perfectly matches the project's patterns and standards.
 
 Project Overview:
 Language: {project_info.get('language', 'unknown')}
@@ -24,36 +218,36 @@ Primary Purpose: Code generation and project analysis
 
 Project Metrics:
 - Files & Structure:
-  - Total Files: {len(project_structure['files'])}
+  - Total Files: {len(files)}
   - Config Files: {len(project_structure['config_files'])}
 - Dependencies:
   - Frameworks: {', '.join(project_structure['frameworks']) or 'none'}
-  - Core Dependencies: {', '.join(list(project_structure['dependencies'].keys())[:10])}
-  - Total Dependencies: {len(project_structure['dependencies'])}
+  - Core Dependencies: {', '.join(islice(dependencies, 10))}
+  - Total Dependencies: {len(dependencies)}
 
 Project Ecosystem:
 1. Development Environment:
 - Project Structure:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if f.endswith(('.json', '.md', '.env', '.gitignore'))][:5])}
-- IDE Configuration:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if '.vscode' in f or '.idea' in f][:5])}
-- Build System:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if f in ['setup.py', 'requirements.txt', 'package.json', 'Makefile', 'composer.json', 'Gemfile', 'CMakeLists.txt', 'build.gradle', 'pom.xml', 'webpack.config.js']])}
-
-2. Project Components:
-- Core Modules:
-{chr(10).join([f"- {f}: {sum(1 for p in project_structure['patterns']['function_patterns'] if p['file'] == f)} functions" for f in project_structure['files'] if f.endswith('.py, .js, .ts, .tsx, .kt, .php, .swift, .cpp, .c, .h, .hpp, .cs, .csx') and not any(x in f.lower() for x in ['setup', 'config'])][:5])}
-- Support Modules:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if any(x in f.lower() for x in ['util', 'helper', 'common', 'shared'])][:5])}
-- Templates:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if 'template' in f.lower()][:5])}
-
-3. Module Organization Analysis:
-- Core Module Functions:
-{chr(10).join([f"- {f}: Primary module handling {f.split('_')[0].title()} functionality" for f in project_structure['files'] if f.endswith('.py, .js, .ts, .tsx, .kt, .php, .swift, .cpp, .c, .h, .hpp, .cs, .csx') and not any(x in f.lower() for x in ['setup', 'config'])][:5])}
-
-- Module Dependencies:
-{chr(10).join([f"- {f} depends on: {', '.join(list(set([imp.split('.')[0] for imp in project_structure['patterns']['imports'] if imp in f])))}" for f in project_structure['files'] if f.endswith('.py, .js, .ts, .tsx, .kt, .php, .swift, .cpp, .c, .h, .hpp, .cs, .csx')][:5])}
+""")
+    parts.append("\n".join(f"- {f}" for f in buckets['project']))
+    parts.append("\n- IDE Configuration:\n")
+    parts.append("\n".join(f"- {f}" for f in buckets['ide']))
+    parts.append("\n- Build System:\n")
+    parts.append("\n".join(f"- {f}" for f in buckets['build']))
+
+    parts.append("\n\n2. Project Components:\n- Core Modules:\n")
+    parts.append("\n".join(f"- {f}: {len(functions_by_file.get(f, ()))} functions" for f in buckets['core']))
+    parts.append("\n- Support Modules:\n")
+    parts.append("\n".join(f"- {f}" for f in buckets['support']))
+    parts.append("\n- Templates:\n")
+    parts.append("\n".join(f"- {f}" for f in buckets['templates']))
+
+    parts.append("\n\n3. Module Organization Analysis:\n- Core Module Functions:\n")
+    parts.append("\n".join(f"- {f}: Primary module handling {f.split('_')[0].title()} functionality" for f in buckets['core']))
+    parts.append("\n\n- Module Dependencies:\n")
+    parts.append("\n".join(f"- {f} depends on: {', '.join({imp.split('.', 1)[0] for imp in unique_imports if imp in f})}" for f in buckets['code']))
+
+    parts.append("""
 
 - Module Responsibilities:
 Please analyze each module's code and describe its core responsibilities based on:
@@ -76,7 +270,32 @@ Based on the codebase analysis, identify and describe:
 7. Performance optimization patterns
 
 Code Sample Analysis:
-{chr(10).join(f"File: {file}:{chr(10)}{content[:10000]}..." for file, content in list(project_structure['code_contents'].items())[:50])}
+""")
+    # 代码样本逐段追加到 parts，不再先拼成一个中间大字符串。
+    # token 预算按 1/(i+1) 的权重分配，靠前的文件分得更多；
+    # 每个文件都从剩余预算中按剩余权重取份额，前面用不完的预算自动留给后面的文件
+    samples = list(islice(project_structure['code_contents'].items(), 50))
+    weights = [1 / (i + 1) for i in range(len(samples))]
+    remaining_tokens = CODE_SAMPLE_TOKEN_BUDGET
+    remaining_weight = sum(weights)
+    first = True
+    for (file, content), weight in zip(samples, weights):
+        budget = int(remaining_tokens * weight / remaining_weight)
+        remaining_weight -= weight
+        sample, used = _truncate_to_tokens(content[:CODE_SAMPLE_CHARS], budget)
+        if not sample:
+            continue
+        remaining_tokens -= used
+        if not first:
+            parts.append("\n")
+        first = False
+        parts.extend(("File: ", file, ":\n", sample, "..."))
+
+    # 项目描述与 AI 规则在同一次请求中生成，省去第二次模型调用
+    parts.append("\n\n")
+    parts.append(_description_section(project_structure, buckets['python_core']))
+
+    parts.append("""
 
 Based on this detailed analysis, create behavior rules for AI to:
 1. Replicate the project's exact code style and patterns
@@ -89,34 +308,35 @@ Based on this detailed analysis, create behavior rules for AI to:
 8. Use established logging methods
 9. Follow configuration patterns
 
-Return a JSON object defining AI behavior rules:
-{{"ai_behavior": {{
-    "code_generation": {{
-        "style": {{
+Return a JSON object with the project description and the AI behavior rules:
+{"description": "",  # The 2-3 sentence project description
+"ai_behavior": {
+    "code_generation": {
+        "style": {
             "prefer": [],
             "avoid": []
-        }},
-        "error_handling": {{
+        },
+        "error_handling": {
             "prefer": [],
             "avoid": []
-        }},
-        "performance": {{
+        },
+        "performance": {
             "prefer": [],
             "avoid": []
-        }},
-        "suggest_patterns": {{
+        },
+        "suggest_patterns": {
             "improve": [],
             "avoid": []
-        }},
-        "module_organization": {{
+        },
+        "module_organization": {
             "structure": [],  # Analyze and describe the current module structure
             "dependencies": [],  # Analyze actual dependencies between modules
-            "responsibilities": {{}},  # Analyze and describe each module's core responsibilities
+            "responsibilities": {},  # Analyze and describe each module's core responsibilities
             "rules": [],  # Extract rules from actual code organization patterns
-            "naming": {{}}  # Extract naming conventions from actual code
-        }}
-    }}
-}}}}
+            "naming": {}  # Extract naming conventions from actual code
+        }
+    }
+}}
 
 Critical Guidelines for AI:
 1. NEVER deviate from existing code patterns
@@ -125,6 +345,6 @@ Critical Guidelines for AI:
 4. COPY the existing skill level approach
 5. PRESERVE all established practices
 6. REPLICATE the project's exact style
-7. UNDERSTAND pattern purposes"""
+7. UNDERSTAND pattern purposes""")
 
-    return prompt
+    return "".join(parts)
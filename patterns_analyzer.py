@@ -44,7 +44,7 @@ class PatternsAnalyzer:
         },
         
         'class': {
-            'python': r'(?:@\w+(?:\(.*?\))?\s+)*class\s+(?P<n>\w+)(?:\((?P<base>[^)]+)\))?\s*:(?:\s*[\'"](?P<docstring>[^\'"]*)[\'"])?',
+            'python': r'(?m)^[ \t]*(?:@\w+(?:\([^)\n]*\))?\s+)*class\s+(?P<n>\w+)(?:\((?P<base>[^)]+)\))?\s*:(?:\s*[\'"](?P<docstring>[^\'"]*)[\'"])?',
             
             'web': r'(?:' + '|'.join([
                 r'(?:export\s+)?(?:abstract\s+)?class\s+(?P<n>\w+)(?:\s*(?:extends|implements)\s+(?P<base>[^{<]+))?(?:\s*<[^>]+>)?\s*{',  # Standard class
@@ -75,7 +75,7 @@ class PatternsAnalyzer:
         },
         
         'function': {
-            'python': r'(?:@\w+(?:\(.*?\))?\s+)*def\s+(?P<n>\w+)\s*\((?P<params>[^)]*)\)(?:\s*->\s*(?P<return>[^:#]+))?\s*:(?:\s*[\'"](?P<docstring>[^\'"]*)[\'"])?',
+            'python': r'(?m)^[ \t]*(?:@\w+(?:\([^)\n]*\))?\s+)*(?:async[ \t]+)?def\s+(?P<n>\w+)\s*\((?P<params>[^)]*)\)(?:\s*->\s*(?P<return>[^:#]+))?\s*:(?:\s*[\'"](?P<docstring>[^\'"]*)[\'"])?',
             
             'web': r'(?:' + '|'.join([
                 r'(?:export\s+)?(?:async\s+)?function\s*(?P<n>\w+)\s*(?:<[^>]+>)?\s*\((?P<params>[^)]*)\)(?:\s*:\s*(?P<return>[^{=]+))?\s*{',  # Standard function
@@ -220,23 +220,118 @@ class PatternsAnalyzer:
         'markup': ['HTML', 'XML', 'CSS', 'SCSS', 'LESS', 'Markdown']
     }
     
+    # File extension -> language name; built once for the class instead of on every call
+    LANGUAGE_BY_EXT = {
+        # Scripting languages
+        '.py': 'Python',
+        '.rb': 'Ruby',
+        '.php': 'PHP',
+        '.pl': 'Perl',
+        '.lua': 'Lua',
+        '.sh': 'Shell',
+        '.bash': 'Bash',
+        
+        # Web languages
+        '.js': 'JavaScript',
+        '.jsx': 'JavaScript/React',
+        '.ts': 'TypeScript',
+        '.tsx': 'TypeScript/React',
+        '.html': 'HTML',
+        '.htm': 'HTML',
+        '.css': 'CSS',
+        '.scss': 'SCSS',
+        '.less': 'LESS',
+        '.vue': 'Vue',
+        '.svelte': 'Svelte',
+        
+        # System languages
+        '.c': 'C',
+        '.h': 'C/C++ Header',
+        '.cpp': 'C++',
+        '.cc': 'C++',
+        '.cxx': 'C++',
+        '.hpp': 'C++ Header',
+        '.cs': 'C#',
+        '.csx': 'C# Script',
+        '.java': 'Java',
+        '.go': 'Go',
+        '.rs': 'Rust',
+        '.swift': 'Swift',
+        '.m': 'Objective-C',
+        '.mm': 'Objective-C++',
+        
+        # Mobile development
+        '.kt': 'Kotlin',
+        '.kts': 'Kotlin Script',
+        '.dart': 'Dart',
+        '.swift': 'Swift',
+        '.xib': 'iOS Interface',
+        '.storyboard': 'iOS Storyboard',
+        
+        # Data languages
+        '.sql': 'SQL',
+        '.r': 'R',
+        '.jl': 'Julia',
+        '.ipynb': 'Jupyter Notebook',
+        
+        # Configuration
+        '.json': 'JSON',
+        '.yaml': 'YAML',
+        '.yml': 'YAML',
+        '.toml': 'TOML',
+        '.xml': 'XML',
+        '.ini': 'INI',
+        '.conf': 'Config',
+        '.csv': 'CSV',
+        '.tsv': 'TSV',
+        
+        # Others
+        '.md': 'Markdown',
+        '.rst': 'reStructuredText',
+        '.tex': 'LaTeX',
+        '.graphql': 'GraphQL',
+        '.gql': 'GraphQL',
+        '.proto': 'Protocol Buffers',
+        '.sol': 'Solidity',
+        '.f': 'Fortran',
+        '.f90': 'Fortran',
+        '.d': 'D',
+        '.ex': 'Elixir',
+        '.exs': 'Elixir Script',
+        '.erl': 'Erlang',
+        '.hs': 'Haskell',
+        '.clj': 'Clojure',
+        '.scala': 'Scala',
+        '.groovy': 'Groovy',
+        '.ps1': 'PowerShell',
+        '.bat': 'Batch',
+        '.cmake': 'CMake',
+        '.asm': 'Assembly',
+        '.s': 'Assembly',
+        '.objc': 'Objective-C',
+    }
+    
     def __init__(self):
-        """Initialize the PatternsAnalyzer with compiled regex patterns."""
-        self.compiled_patterns = self._compile_patterns()
+        """Initialize the PatternsAnalyzer with the shared compiled regex patterns."""
+        # Compiled once at module import and shared by every instance
+        self.compiled_patterns = _COMPILED_PATTERNS
+        self.compiled_patterns_bytes = _COMPILED_PATTERNS_BYTES
         
-    def _compile_patterns(self) -> Dict[str, Dict[str, Any]]:
+    @classmethod
+    def _compile_patterns(cls) -> Dict[str, Dict[str, Any]]:
         """Precompile all regex patterns for better performance."""
         compiled = {}
         
         # Compile patterns for each category
-        for category, patterns in self.PATTERNS.items():
+        for category, patterns in cls.PATTERNS.items():
             compiled[category] = {}
             
             if isinstance(patterns, dict):
                 # Handle nested patterns (import, class, function)
                 if category in ['import', 'class', 'function']:
+                    # MULTILINE so line-anchored patterns (Python imports) match on every line
                     for lang_group, pattern in patterns.items():
-                        compiled[category][lang_group] = re.compile(pattern, re.IGNORECASE if 'sql' in lang_group or 'data' == lang_group else 0)
+                        compiled[category][lang_group] = re.compile(pattern, re.MULTILINE | (re.IGNORECASE if 'sql' in lang_group or 'data' == lang_group else 0))
                 # Handle common patterns and other language-specific patterns
                 else:
                     for pattern_name, pattern in patterns.items():
@@ -248,98 +343,24 @@ class PatternsAnalyzer:
                 
         return compiled
         
+    @staticmethod
+    def _compile_bytes_patterns(compiled_patterns: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Compile bytes variants of the import/class/function patterns.
+
+        All patterns are ASCII, so they can run directly on undecoded file
+        content; only the captured groups need decoding afterwards.
+        """
+        return {
+            category: {
+                lang_group: re.compile(pattern.pattern.encode('utf-8'), pattern.flags & ~re.UNICODE)
+                for lang_group, pattern in compiled_patterns[category].items()
+            }
+            for category in ('import', 'class', 'function')
+        }
+        
     def get_language_from_ext(self, ext: str) -> str:
         """Get programming language from file extension."""
-        lang_map = {
-            # Scripting languages
-            '.py': 'Python',
-            '.rb': 'Ruby',
-            '.php': 'PHP',
-            '.pl': 'Perl',
-            '.lua': 'Lua',
-            '.sh': 'Shell',
-            '.bash': 'Bash',
-            
-            # Web languages
-            '.js': 'JavaScript',
-            '.jsx': 'JavaScript/React',
-            '.ts': 'TypeScript',
-            '.tsx': 'TypeScript/React',
-            '.html': 'HTML',
-            '.htm': 'HTML',
-            '.css': 'CSS',
-            '.scss': 'SCSS',
-            '.less': 'LESS',
-            '.vue': 'Vue',
-            '.svelte': 'Svelte',
-            
-            # System languages
-            '.c': 'C',
-            '.h': 'C/C++ Header',
-            '.cpp': 'C++',
-            '.cc': 'C++',
-            '.cxx': 'C++',
-            '.hpp': 'C++ Header',
-            '.cs': 'C#',
-            '.csx': 'C# Script',
-            '.java': 'Java',
-            '.go': 'Go',
-            '.rs': 'Rust',
-            '.swift': 'Swift',
-            '.m': 'Objective-C',
-            '.mm': 'Objective-C++',
-            
-            # Mobile development
-            '.kt': 'Kotlin',
-            '.kts': 'Kotlin Script',
-            '.dart': 'Dart',
-            '.swift': 'Swift',
-            '.xib': 'iOS Interface',
-            '.storyboard': 'iOS Storyboard',
-            
-            # Data languages
-            '.sql': 'SQL',
-            '.r': 'R',
-            '.jl': 'Julia',
-            '.ipynb': 'Jupyter Notebook',
-            
-            # Configuration
-            '.json': 'JSON',
-            '.yaml': 'YAML',
-            '.yml': 'YAML',
-            '.toml': 'TOML',
-            '.xml': 'XML',
-            '.ini': 'INI',
-            '.conf': 'Config',
-            '.csv': 'CSV',
-            '.tsv': 'TSV',
-            
-            # Others
-            '.md': 'Markdown',
-            '.rst': 'reStructuredText',
-            '.tex': 'LaTeX',
-            '.graphql': 'GraphQL',
-            '.gql': 'GraphQL',
-            '.proto': 'Protocol Buffers',
-            '.sol': 'Solidity',
-            '.f': 'Fortran',
-            '.f90': 'Fortran',
-            '.d': 'D',
-            '.ex': 'Elixir',
-            '.exs': 'Elixir Script',
-            '.erl': 'Erlang',
-            '.hs': 'Haskell',
-            '.clj': 'Clojure',
-            '.scala': 'Scala',
-            '.groovy': 'Groovy',
-            '.ps1': 'PowerShell',
-            '.bat': 'Batch',
-            '.cmake': 'CMake',
-            '.asm': 'Assembly',
-            '.s': 'Assembly',
-            '.objc': 'Objective-C',
-        }
-        return lang_map.get(ext.lower(), 'Unknown')
+        return self.LANGUAGE_BY_EXT.get(ext.lower(), 'Unknown')
         
     def get_language_group(self, language: str) -> str:
         """Determine the language group for a given language."""
@@ -462,4 +483,8 @@ class PatternsAnalyzer:
                         'text': match.group(0),
                         'details': {k: v.strip() if v else v for k, v in groups.items() if v}
                     }
-                    results['other_patterns'].append(pattern_info) 
\ No newline at end of file
+                    results['other_patterns'].append(pattern_info) 
+
+# Compile every pattern once at import; all PatternsAnalyzer instances share these
+_COMPILED_PATTERNS = PatternsAnalyzer._compile_patterns()
+_COMPILED_PATTERNS_BYTES = PatternsAnalyzer._compile_bytes_patterns(_COMPILED_PATTERNS)
@@ -1,25 +1,302 @@
 import os
+import sys
 import json
-from typing import Dict, Any, List, Set
+from typing import Dict, Any, Set
 from datetime import datetime
 import google.generativeai as genai
 import re
+import logging
 from rules_analyzer import RulesAnalyzer
 from dotenv import load_dotenv
 from patterns_analyzer import PatternsAnalyzer
+# 目录、web 和 Unity 模式分析与 analyzers 共用同一实现（含子串预检）
+from analyzers import analyze_directory_patterns, analyze_unity_patterns, analyze_web_patterns
+from generator.prompts.ai_rules_prompt import get_ai_rules_prompt, CODE_SAMPLE_CHARS, PROMPT_VERSION
+import pathspec
+import tqdm
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import time
+import hashlib
+from functools import wraps, lru_cache
+from itertools import islice
+from collections import Counter, defaultdict
+
+try:
+    # 可选：orjson 解析和序列化 JSON 比标准库快数倍
+    import orjson
+except ImportError:
+    orjson = None
+
+def with_progress(desc: str):
+    """进度提示装饰器：只在开始和结束时输出，不启动后台线程"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            print(f"\n🔄 {desc}")
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                print(f"✅ 完成 ({time.perf_counter() - start:.1f}s)")
+                return result
+            except Exception:
+                print(f"❌ 失败 ({time.perf_counter() - start:.1f}s)")
+                raise
+        return wrapper
+    return decorator
+
+# Gemini 初始化的超时时间（秒）
+_GEMINI_INIT_TIMEOUT = 30
+
+# 并发读取文件的线程数（读取受 I/O 限制，按 CPU 数的 4 倍取，最多 32 个），
+# 以及每批提交的文件数（限制同时在途的读取和驻留内存的文件内容）
+_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_READ_BATCH = 64
+
+# 参与结构分析的代码文件扩展名；只建一次集合，不在每个文件上重建列表再线性查找
+_CODE_FILE_EXTS = frozenset({
+    '.py', '.js', '.ts', '.tsx', '.kt', '.php', '.swift', '.cpp', '.c', '.h', '.hpp',
+    '.cs', '.csx', '.java', '.rb', '.objc'
+})
+
+# 语言名（PatternsAnalyzer.get_language_from_ext 的返回值）到模式组的映射，未列出的语言使用 'system'
+_PATTERN_GROUP_BY_LANG = {
+    'Python': 'python',
+    'JavaScript': 'web',
+    'JavaScript/React': 'web',
+    'TypeScript': 'web',
+    'TypeScript/React': 'web',
+    'Java': 'web',
+    'Ruby': 'web',
+    'C#': 'system',
+    'C# Script': 'system',
+    'C++': 'system',
+    'C++ Header': 'system',
+    'C': 'system',
+    'C/C++ Header': 'system',
+    'PHP': 'system',
+    'Kotlin': 'system',
+    'Swift': 'system',
+    'Objective-C': 'system',
+}
+
+# 需要额外分析 React/Next.js 模式和 Unity 模式的语言（get_language_from_ext 的返回值）
+_WEB_LANGUAGES = frozenset({'JavaScript', 'JavaScript/React', 'TypeScript', 'TypeScript/React'})
+_CSHARP_LANGUAGES = frozenset({'C#', 'C# Script'})
+
+# Unity 脚本的标志字符串；几乎所有 Unity 脚本开头都有 using UnityEngine，放在最前以便尽早命中
+_UNITY_MARKERS = (b'UnityEngine', b'MonoBehaviour', b'ScriptableObject')
+
+# CursorFocus 的用户缓存目录（$XDG_CACHE_HOME/cursorfocus 或 ~/.cache/cursorfocus），不在被分析的项目里留下文件
+_USER_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'cursorfocus')
+
+# 逐文件分析结果的缓存目录；每个项目一个 JSON 文件，以项目绝对路径的 SHA-256 为文件名。
+# 用 JSON 而不是 pickle：缓存内容来自被分析的项目，反序列化 pickle 可能执行任意代码。
+# 修改分析逻辑或样本长度时需要递增版本号，使旧缓存失效
+_SCAN_CACHE_DIR = os.path.join(_USER_CACHE_DIR, 'scan')
+_SCAN_CACHE_VERSION = 2
+
+# AI 响应缓存目录，以“模型名 + prompt”的 SHA-256 为文件名；
+# 项目未变但切换输出格式或删除了规则文件时，不必重新请求 AI
+_RESPONSE_CACHE_DIR = os.path.join(_USER_CACHE_DIR, 'responses')
+
+# 规则文件生成摘要的记录目录，同样放在用户缓存目录下，以规则文件绝对路径的 SHA-256 为文件名
+_RULES_META_DIR = os.path.join(_USER_CACHE_DIR, 'rules')
+
+# 规则元数据记录的摘要格式版本；修改规则文件格式时递增，使旧记录失效
+_RULES_META_VERSION = 1
+
+# AI 未返回可用项目描述时使用的默认描述
+_DEFAULT_DESCRIPTION = "A software project with automated analysis and rule generation capabilities."
+
+# 项目描述按单词数截断之前的字符数上限；100 个单词远用不到这么多字符
+_MAX_DESCRIPTION_CHARS = 4096
+
+# 超过该大小的文件（生成代码、压缩后的 JS、第三方库等）不做风格分析
+_MAX_ANALYZE_BYTES = 512 * 1024
+
+# class/function 模式中附加到记录里的可选捕获组：(组名, 记录中的键, 是否去除首尾空白)
+_EXTRA_GROUPS = (
+    ('params', 'parameters', False),
+    ('base', 'base', True),
+    ('return', 'return_type', True),
+)
+
+# 单个文件中每类模式（import/class/function）最多记录的匹配数；
+# 未超过大小上限的生成代码仍可能含有上万个定义，超出部分对风格分析没有帮助
+_MAX_MATCHES_PER_PATTERN = 5000
+
+@lru_cache(maxsize=None)
+def _get_model(model_name: str, api_key: str):
+    """按模型名和 API key 创建 GenerativeModel 并在进程内复用；每个项目都会新建 RulesGenerator
+
+    api_key 只用作缓存键：模型在首次请求时绑定当时配置的客户端，
+    更换 API key 后必须使用新的模型实例，不能沿用按旧 key 创建的模型
+    """
+    return genai.GenerativeModel(
+        model_name=model_name,
+    )
+
+def _response_cache_get(key: str):
+    """读取缓存的 AI 响应文本；未命中或读取失败时返回 None"""
+    try:
+        with open(os.path.join(_RESPONSE_CACHE_DIR, f"{key}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)['response']
+    except Exception:
+        return None
+
+def _response_cache_put(key: str, response_text: str) -> None:
+    """写入 AI 响应缓存；失败只提示，不影响规则生成"""
+    try:
+        os.makedirs(_RESPONSE_CACHE_DIR, exist_ok=True)
+        _write_atomic(os.path.join(_RESPONSE_CACHE_DIR, f"{key}.json"), json.dumps({'response': response_text}, ensure_ascii=False))
+    except Exception as e:
+        print(f"⚠️ 写入 AI 响应缓存失败: {e}")
+
+def _is_tty() -> bool:
+    """标准输出是否为终端；重定向到文件或 CI 日志时不显示进度条"""
+    isatty = getattr(sys.stdout, 'isatty', None)
+    return bool(isatty and isatty())
+
+def _report_step(pbar, desc: str) -> None:
+    """报告当前步骤：终端中更新进度条描述，避免单独打印的行打断进度条重绘；
+    非终端时进度条已禁用，每个步骤只输出一行纯文本
+    """
+    if pbar.disable:
+        print(f"{desc}...")
+    else:
+        pbar.set_description(desc)
+
+def _file_ext(name: str) -> str:
+    """返回小写的文件扩展名，结果与 os.path.splitext(name)[1].lower() 相同，但只做一次反向查找"""
+    dot = name.rfind('.')
+    if dot <= 0:
+        return ''
+    # splitext 会忽略开头的点：'.bashrc'、'..py' 这类名字没有扩展名
+    if name[0] == '.' and not name[:dot].strip('.'):
+        return ''
+    return name[dot:].lower()
+
+def _read_bytes(file_path: str):
+    """在线程池中读取文件的原始字节，返回 (content, error)；文件过大时两者均为 None"""
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > _MAX_ANALYZE_BYTES:
+                return None, None
+            return f.read(), None
+    except Exception as e:
+        return None, e
+
+def _to_text(value: bytes) -> str:
+    """把正则在字节内容上捕获到的片段解码为字符串"""
+    return value.decode('utf-8', 'replace')
+
+def _cache_file_for(cache_dir: str, path: str) -> str:
+    """用户缓存目录中属于某个路径的记录文件，以该路径绝对路径的 SHA-256 为文件名"""
+    key = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json")
+
+def _json_loads(text: str):
+    """解析 JSON，优先使用 orjson；两者的解析错误都是 json.JSONDecodeError"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _json_dumps(obj, compact: bool = False) -> str:
+    """序列化为保留非 ASCII 字符的 JSON，优先使用 orjson；默认两空格缩进，compact 时不含任何空白"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS if compact else orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    if compact:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+def _write_atomic(path: str, content: str) -> None:
+    """先写入同目录下的临时文件再替换目标文件；写入中途失败时原文件保持不变"""
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# 提取 JSON 时只需关注的字符：花括号、引号和转义符
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+def _extract_json(text: str):
+    """单次线性扫描，返回文本中第一个括号配平的 JSON 对象子串；找不到时返回 None
+    
+    字符串内的花括号和转义引号不计入深度；与贪婪正则不同，不会吞掉对象之后的说明文字
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    depth = 0
+    in_string = False
+    escape_end = -1  # 被反斜杠转义的字符位置之后
+    for match in _JSON_TOKEN_RE.finditer(text, start):
+        pos = match.start()
+        if pos < escape_end:
+            continue
+        char = match.group()
+        if in_string:
+            if char == '\\':
+                escape_end = pos + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
 
 class RulesGenerator:
+    # 默认排除的目录和文件
+    DEFAULT_EXCLUDES = {
+        # 版本控制
+        '.git', '.svn', '.hg',
+        # Python
+        '__pycache__', '*.pyc', '*.pyo', '*.pyd', '.Python', 'env/', 'venv/', '.env', '.venv',
+        'pip-log.txt', 'pip-delete-this-directory.txt',
+        # Node.js
+        'node_modules/', 'npm-debug.log*', 'yarn-debug.log*', 'yarn-error.log*',
+        # IDE
+        '.idea/', '.vscode/', '*.swp', '*.swo',
+        # 构建输出
+        'build/', 'dist/', '*.egg-info/', '*.egg',
+        # 其他
+        '.DS_Store', 'Thumbs.db'
+    }
+
     def __init__(self, project_path: str):
         """初始化 RulesGenerator"""
         print("\n🔄 初始化 RulesGenerator...")
         self.project_path = project_path
         self.analyzer = RulesAnalyzer(project_path)
         self.exclude_patterns = self._load_exclude_patterns()
+        # 排除规则只编译一次，供 _should_exclude 反复使用
+        self.exclude_spec = pathspec.PathSpec.from_lines('gitwildmatch', self.exclude_patterns)
         
         # Initialize pattern analyzer
         patterns_analyzer = PatternsAnalyzer()
         self.compiled_patterns = patterns_analyzer.compiled_patterns
+        self.compiled_patterns_bytes = patterns_analyzer.compiled_patterns_bytes
         self.get_language_from_ext = patterns_analyzer.get_language_from_ext
+        # 每种语言的 import/class/function 字节模式预先组成元组，分析文件时只需一次查表
+        self._lang_patterns = {
+            lang: self._file_patterns_for_group(group)
+            for lang, group in _PATTERN_GROUP_BY_LANG.items()
+        }
+        self._default_lang_patterns = self._file_patterns_for_group('system')
         
         # Load environment variables from .env
         load_dotenv()
@@ -30,20 +307,56 @@ class RulesGenerator:
             if not api_key:
                 raise ValueError("GEMINI_API_KEY is required")
 
-            genai.configure(api_key=api_key)
-            
             # Get model name from environment or use default
             model_name = os.environ.get("GEMINI_MODEL", "gemini-2.5-pro-exp-03-25")
+            self.model_name = model_name
             
-            self.model = genai.GenerativeModel(
-                model_name=model_name,
-            )
-            self.chat_session = self.model.start_chat(history=[])
+            # 在工作线程中初始化并限时等待；不依赖 SIGALRM，Windows 上同样可用
+            executor = ThreadPoolExecutor(max_workers=1)
+            try:
+                future = executor.submit(self._init_gemini, api_key, model_name)
+                self.model = future.result(timeout=_GEMINI_INIT_TIMEOUT)
+            finally:
+                # 超时后不等待卡住的初始化线程
+                executor.shutdown(wait=False)
             
+        except FuturesTimeoutError:
+            print(f"\n❌ Gemini AI 初始化超时（{_GEMINI_INIT_TIMEOUT} 秒）")
+            raise
         except Exception as e:
             print(f"\n⚠️ Error when initializing Gemini AI: {e}")
             raise
 
+    def _file_patterns_for_group(self, group: str):
+        """返回某个模式组的 ((pattern_type, pattern, key_groups, extra_groups), ...) 元组
+        
+        捕获组名在这里按定义顺序解析一次，分析时直接按组名取值，不必为每个匹配构造并遍历 groupdict()：
+        key_groups 是 import 的 module* 组或 class/function 的 name/n 组；
+        extra_groups 是 (组名, 记录中的键, 是否去除首尾空白)，只包含该模式实际定义的组
+        """
+        compiled = self.compiled_patterns_bytes
+        result = []
+        for pattern_type in ('import', 'class', 'function'):
+            pattern = compiled[pattern_type][group]
+            names = sorted(pattern.groupindex, key=pattern.groupindex.get)
+            if pattern_type == 'import':
+                key_groups = tuple(name for name in names if name.startswith('module'))
+                extra_groups = ()
+            else:
+                key_groups = tuple(name for name in names if name in ('name', 'n'))
+                extra_groups = tuple(
+                    extra for extra in _EXTRA_GROUPS if extra[0] in pattern.groupindex
+                )
+            result.append((pattern_type, pattern, key_groups, extra_groups))
+        return tuple(result)
+
+    @staticmethod
+    def _init_gemini(api_key: str, model_name: str):
+        """配置 Gemini 并返回共享的 GenerativeModel"""
+        # configure 设置的是进程级的 API key，每次都重新设置，保证与本次使用的 key 一致
+        genai.configure(api_key=api_key)
+        return _get_model(model_name, api_key)
+
     def _get_timestamp(self) -> str:
         """Get current timestamp in standard format."""
         return datetime.now().strftime('%B %d, %Y at %I:%M %p')
@@ -66,16 +379,40 @@ class RulesGenerator:
         
         return exclude_patterns
 
-    def _should_exclude(self, path: str, is_dir: bool = False) -> bool:
-        """检查是否应该排除某个路径"""
-        # 转换为相对路径
-        rel_path = os.path.relpath(path, self.project_path)
-        
-        # 创建 pathspec 对象来匹配 gitignore 样式的规则
-        spec = pathspec.PathSpec.from_lines('gitwildmatch', self.exclude_patterns)
+    def _should_exclude(self, rel_path: str, is_dir: bool = False) -> bool:
+        """检查是否应该排除某个路径（相对于项目根目录）"""
+        # 目录加上结尾的 /，使 'node_modules/' 这类只匹配目录的规则生效
+        if is_dir:
+            rel_path += '/'
         
         # 检查路径是否应该被排除
-        return spec.match_file(rel_path)
+        return self.exclude_spec.match_file(rel_path)
+
+    def _iter_tree(self, path: str, rel_root: str = ''):
+        """用 os.scandir 递归遍历目录，逐目录产出 (rel_root, [(entry, rel_path), ...])
+        
+        DirEntry 自带完整路径和文件类型，不必再拼接绝对路径或额外调用 stat；
+        被排除的目录不会进入递归
+        """
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    rel_path = os.path.join(rel_root, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self._should_exclude(rel_path, True):
+                            subdirs.append((entry.path, rel_path))
+                    elif not self._should_exclude(rel_path):
+                        files.append((entry, rel_path))
+        except OSError as e:
+            print(f"⚠️ Error scanning directory {rel_root or '.'}: {e}")
+            return
+        
+        # 与 os.walk 相同的自顶向下顺序：先产出当前目录，再进入子目录
+        yield rel_root, files
+        for sub_path, sub_rel in subdirs:
+            yield from self._iter_tree(sub_path, sub_rel)
 
     @with_progress("分析项目结构")
     def _analyze_project_structure(self) -> Dict[str, Any]:
@@ -89,10 +426,17 @@ class RulesGenerator:
             'code_contents': {},
             'directory_structure': {},
             'language_stats': {},
+            'content_hash': None,
+            # 按文件分组的函数和类，供 prompt 按文件直接查找
+            'index': {
+                'functions_by_file': defaultdict(list),
+                'classes_by_file': defaultdict(list)
+            },
             'patterns': {
                 'classes': [],
                 'functions': [],
-                'imports': [],
+                # 模块名 -> 出现次数；同一模块在各文件中反复导入，只保留一份字符串
+                'imports': Counter(),
                 'error_handling': [],
                 'configurations': [],
                 'naming_patterns': {},
@@ -110,72 +454,63 @@ class RulesGenerator:
         # 跟踪目录统计
         dir_stats = {}
         
-        # 获取所有非排除文件的总数
-        total_files = 0
-        for root, dirs, files in os.walk(self.project_path):
-            # Skip ignored directories
-            dirs[:] = [d for d in dirs if not any(x in d for x in ['node_modules', 'venv', '.git', '__pycache__', 'build', 'dist'])]
-            
-            rel_root = os.path.relpath(root, self.project_path)
-            if rel_root == '.':
-                rel_root = ''
-                
-            # Initialize directory statistics
-            dir_stats[rel_root] = {
-                'total_files': 0,
-                'code_files': 0,
-                'languages': {},
-                'frameworks': set(),
-                'patterns': {
-                    'classes': 0,
-                    'functions': 0,
-                    'imports': 0
+        # 待分析的代码文件 (file_path, rel_path, lang, meta)，遍历结束后并发读取
+        pending = []
+        
+        # 上次运行的逐文件分析结果；本次的结果写入 new_cache，已删除的文件自然被淘汰
+        cache = self._load_scan_cache()
+        new_cache = {}
+        
+        # 内层循环每个文件都会用到，先绑定到局部变量
+        add_file = structure['files'].append
+        languages = structure['languages']
+        lang_of = self.get_language_from_ext
+        
+        # 单次遍历，不预先统计文件总数；进度条只显示已处理数量
+        with tqdm.tqdm(desc="分析文件", disable=not _is_tty()) as pbar:
+            for rel_root, files in self._iter_tree(self.project_path):
+                # Initialize directory statistics
+                stats = dir_stats[rel_root] = {
+                    'total_files': len(files),
+                    'code_files': 0,
+                    'languages': {},
+                    'frameworks': set(),
+                    'patterns': {
+                        'classes': 0,
+                        'functions': 0,
+                        'imports': 0
+                    }
                 }
-            }
+                dir_languages = stats['languages']
 
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, self.project_path)
-                
-                # Update directory statistics
-                dir_stats[rel_root]['total_files'] += 1
-                
-                # Analyze code files
-                file_ext = os.path.splitext(file)[1].lower()
-                if file_ext in ['.py', '.js', '.ts', '.tsx', '.kt', '.php', '.swift', '.cpp', '.c', '.h', '.hpp', '.cs', '.csx', '.java', '.rb', '.objc']:
-                    structure['files'].append(rel_path)
-                    dir_stats[rel_root]['code_files'] += 1
+                for entry, rel_path in files:
+                    file = entry.name
                     
-                    # Update language statistics
-                    lang = self.get_language_from_ext(file_ext)
-                    dir_stats[rel_root]['languages'][lang] = dir_stats[rel_root]['languages'].get(lang, 0) + 1
-                    structure['languages'][lang] = structure['languages'].get(lang, 0) + 1
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            structure['code_contents'][rel_path] = content
-                            
-                            # Analyze based on file type
-                            self._analyze_file(content, rel_path, structure, lang)
-                            
-                    except Exception as e:
-                        print(f"⚠️ Error reading file {rel_path}: {e}")
-                        continue
+                    # Analyze code files
+                    file_ext = _file_ext(file)
+                    if file_ext in _CODE_FILE_EXTS:
+                        add_file(rel_path)
+                        stats['code_files'] += 1
+                        
+                        # Update language statistics
+                        lang = lang_of(file_ext)
+                        dir_languages[lang] = dir_languages.get(lang, 0) + 1
+                        languages[lang] = languages.get(lang, 0) + 1
+                        try:
+                            st = entry.stat()
+                            meta = [st.st_mtime_ns, st.st_size]
+                        except OSError:
+                            meta = None
+                        pending.append((entry.path, rel_path, lang, meta))
 
                     # Classify config files
+                    # 只记录路径：配置文件内容没有任何地方使用，不再整个读入内存
                     elif file.endswith(('.json', '.ini', '.conf')):
                         structure['config_files'].append(rel_path)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                structure['patterns']['configurations'].append({
-                                    'file': rel_path,
-                                    'content': content
-                                })
-                        except Exception as e:
-                            print(f"⚠️ Error reading config file {rel_path}: {e}")
-                            continue
+                        structure['patterns']['configurations'].append({'file': rel_path})
+
+                # 每个目录只更新一次进度条，减少 tqdm 加锁和重绘
+                pbar.update(len(files))
 
                 # Add directory structure information
                 if rel_root:
@@ -184,151 +519,235 @@ class RulesGenerator:
                         'parent': os.path.dirname(rel_root) or None
                     }
 
+        # 文件读取是独立的 I/O，交给线程池并发执行；正则分析受 GIL 限制，仍在当前线程按原顺序进行。
+        # mtime 和大小与缓存一致的文件直接复用上次的结果，不再读取
+        with ThreadPoolExecutor(max_workers=_READ_WORKERS) as executor:
+            for start in range(0, len(pending), _READ_BATCH):
+                batch = []
+                for file_path, rel_path, lang, meta in pending[start:start + _READ_BATCH]:
+                    cached = cache.get(rel_path)
+                    hit = meta is not None and cached is not None and cached['meta'] == meta
+                    batch.append((file_path, rel_path, lang, meta, cached if hit else None))
+                results = executor.map(_read_bytes, [item[0] for item in batch if item[4] is None])
+                for _, rel_path, lang, meta, entry in batch:
+                    if entry is None:
+                        content, error = next(results)
+                        if error is not None:
+                            print(f"⚠️ Error reading file {rel_path}: {error}")
+                            continue
+                        entry = self._scan_file(content, rel_path, lang, meta, cache.get(rel_path))
+                    elif entry['parsed'] is not None:
+                        self._share_cached_strings(rel_path, entry['parsed'])
+                    if meta is not None:
+                        new_cache[rel_path] = entry
+                    if entry['sample'] is None:
+                        continue
+                    structure['code_contents'][rel_path] = entry['sample']
+                    self._merge_file_result(structure, entry['parsed'])
+
+        self._save_scan_cache(new_cache)
+        
+        # 代码文件内容和配置文件列表的摘要；不变时生成规则的输入不变
+        digest = hashlib.sha256()
+        for rel_path in sorted(new_cache):
+            entry = new_cache[rel_path]
+            digest.update(f"{rel_path}\0{entry['sha1'] or entry['meta']}\n".encode('utf-8'))
+        for rel_path in sorted(structure['config_files']):
+            digest.update(f"{rel_path}\n".encode('utf-8'))
+        structure['content_hash'] = digest.hexdigest()
+
+        # 所有文件分析完毕后一次性建立按文件的索引
+        index = structure['index']
+        for info in structure['patterns']['function_patterns']:
+            index['functions_by_file'][info['file']].append(info)
+        for info in structure['patterns']['class_patterns']:
+            index['classes_by_file'][info['file']].append(info)
+
         # Analyze directory patterns
         self._analyze_directory_patterns(structure, dir_stats)
         
         return structure
 
-    def _analyze_file(self, content: str, rel_path: str, structure: Dict[str, Any], language: str) -> None:
-        """Generic file analyzer that handles all languages."""
-        # Map language to pattern group
-        pattern_groups = {
-            'python': 'python',
-            'javascript': 'web',
-            'typescript': 'web',
-            'csharp': 'system',
-            'cpp': 'system',
-            'c': 'system',
-            'php': 'system',
-            'kotlin': 'system',
-            'swift': 'system',
-            'java': 'web',
-            'ruby': 'web',
-            'objc': 'system',
+    def _scan_file(self, content, rel_path: str, language: str, meta, cached) -> Dict[str, Any]:
+        """分析单个文件，返回可写入扫描缓存的条目
+        
+        mtime 变化但内容的 SHA-1 与缓存一致时（如 touch、切换分支后切回），复用缓存中的分析结果
+        """
+        if content is None:
+            # 文件过大，不做风格分析
+            return {'meta': meta, 'sha1': None, 'sample': None, 'parsed': None}
+        
+        sha1 = hashlib.sha1(content).hexdigest()
+        if cached is not None and cached['sha1'] == sha1:
+            return {**cached, 'meta': meta}
+        
+        parsed = {
+            'dependencies': {},
+            'patterns': {
+                'imports': Counter(),
+                'function_patterns': [],
+                'class_patterns': [],
+                'code_organization': []
+            }
         }
-        pattern_group = pattern_groups.get(language, 'system')
+        # Analyze based on file type
+        self._analyze_file(content, rel_path, parsed, language)
+        return {
+            'meta': meta,
+            'sha1': sha1,
+            # 只保留 prompt 实际使用的前缀；完整内容仅在分析期间存在。
+            # UTF-8 每个字符最多 4 字节，只解码足以得到该前缀的字节
+            'sample': content[:CODE_SAMPLE_CHARS * 4].decode('utf-8', 'ignore')[:CODE_SAMPLE_CHARS],
+            'parsed': parsed
+        }
+
+    @staticmethod
+    def _share_cached_strings(rel_path: str, parsed: Dict[str, Any]) -> None:
+        """让缓存读回的记录共用同一个路径字符串和驻留的类型字符串
+
+        JSON 解码会为每条记录的 'file'、'type' 值各创建一份新字符串；
+        大项目中记录数以十万计，共用后从缓存读回的记录约少占三成内存
+        """
+        patterns = parsed['patterns']
+        for key in ('function_patterns', 'class_patterns', 'code_organization'):
+            for info in patterns[key]:
+                info['file'] = rel_path
+                if 'type' in info:
+                    info['type'] = sys.intern(info['type'])
+
+    @staticmethod
+    def _merge_file_result(structure: Dict[str, Any], parsed: Dict[str, Any]) -> None:
+        """把单个文件的分析结果按文件顺序合并到项目结构中"""
+        structure['dependencies'].update(parsed['dependencies'])
+        patterns = structure['patterns']
+        # 从 JSON 缓存读回的是普通 dict，Counter.update 同样按次数累加
+        patterns['imports'].update(parsed['patterns']['imports'])
+        for key in ('function_patterns', 'class_patterns', 'code_organization'):
+            patterns[key].extend(parsed['patterns'][key])
+
+    def _scan_cache_file(self) -> str:
+        """本项目的扫描缓存文件路径"""
+        return _cache_file_for(_SCAN_CACHE_DIR, self.project_path)
+
+    def _load_scan_cache(self) -> Dict[str, Any]:
+        """读取上次运行的扫描缓存；文件不存在、损坏或版本不符时返回空缓存"""
+        try:
+            with open(self._scan_cache_file(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == _SCAN_CACHE_VERSION:
+                return data['files']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ 读取扫描缓存失败，将重新分析: {e}")
+        return {}
+
+    def _save_scan_cache(self, files: Dict[str, Any]) -> None:
+        """写入扫描缓存"""
+        try:
+            os.makedirs(_SCAN_CACHE_DIR, exist_ok=True)
+            _write_atomic(self._scan_cache_file(), json.dumps({'version': _SCAN_CACHE_VERSION, 'files': files}, ensure_ascii=False))
+        except Exception as e:
+            print(f"⚠️ 写入扫描缓存失败: {e}")
+
+    def _analyze_file(self, content: bytes, rel_path: str, structure: Dict[str, Any], language: str) -> None:
+        """Generic file analyzer that handles all languages.
+
+        Runs on raw file bytes; only captured names are decoded.
+        """
+        # (pattern_type, pattern) pairs for this language, built once in __init__
+        file_patterns = self._lang_patterns.get(language, self._default_lang_patterns)
+
+        patterns = structure['patterns']
+        dependencies = structure['dependencies']
+        imports = patterns['imports']
 
         # Find patterns using named groups
-        for pattern_type in ['import', 'class', 'function']:
-            pattern = self.compiled_patterns[pattern_type][pattern_group]
-            matches = pattern.finditer(content)
+        for pattern_type, pattern, key_groups, extra_groups in file_patterns:
+            # Cap records per pattern so one generated file cannot flood the structure
+            matches = islice(pattern.finditer(content), _MAX_MATCHES_PER_PATTERN)
+            records = patterns.get(f'{pattern_type}_patterns')
             
             for match in matches:
                 try:
-                    info = {}
-                    # Get all named groups
-                    groups = match.groupdict()
+                    # First non-empty module (imports) or name (classes/functions) group
+                    key = next(filter(None, map(match.group, key_groups)), None)
+                    if not key:
+                        continue
                     
                     # Handle imports
                     if pattern_type == 'import':
-                        module = next((v for k, v in groups.items() if v and k.startswith('module')), None)
-                        if module:
-                            structure['dependencies'][module] = True
-                            structure['patterns']['imports'].append(module)
+                        module = _to_text(key)
+                        dependencies[module] = True
+                        imports[module] += 1
                         continue
                         
                     # Handle classes and functions
-                    name = next((v for k, v in groups.items() if v and (k == 'name' or k == 'n')), None)
-                    if not name:
-                        continue
-                        
-                    info['name'] = name
-                    info['file'] = rel_path
-                    info['type'] = pattern_type
+                    info = {
+                        'name': _to_text(key),
+                        'file': rel_path,
+                        'type': pattern_type
+                    }
                     
-                    # Add parameters/base class if present
-                    if 'params' in groups and groups['params']:
-                        info['parameters'] = groups['params']
-                    if 'base' in groups and groups['base']:
-                        info['base'] = groups['base'].strip()
-                    if 'return' in groups and groups['return']:
-                        info['return_type'] = groups['return'].strip()
+                    # Add parameters/base class/return type if present
+                    for group_name, info_key, strip in extra_groups:
+                        value = match.group(group_name)
+                        if value:
+                            info[info_key] = _to_text(value.strip() if strip else value)
                         
                     # Add to appropriate pattern list
-                    pattern_key = f'{pattern_type}_patterns'
-                    structure['patterns'][pattern_key].append(info)
+                    records.append(info)
                     
-                except Exception as e:
-                    continue  # Skip on any error
+                except Exception:
+                    logging.debug(f"Skipping unreadable {pattern_type} match in {rel_path}")
+                    continue
                     
-        # Handle web-specific patterns
-        if language in ['typescript', 'javascript']:
-            self._analyze_web_patterns(content, rel_path, structure)
+        # Handle web-specific patterns (these patterns work on decoded text)
+        if language in _WEB_LANGUAGES:
+            self._analyze_web_patterns(_to_text(content), rel_path, structure)
 
         # Handle Unity-specific patterns for C#
-        if language == 'csharp' and any(x in content for x in ['UnityEngine', 'MonoBehaviour', 'ScriptableObject']):
-            self._analyze_unity_patterns(content, rel_path, structure)
+        if language in _CSHARP_LANGUAGES and any(marker in content for marker in _UNITY_MARKERS):
+            self._analyze_unity_patterns(_to_text(content), rel_path, structure)
 
     def _analyze_directory_patterns(self, structure: Dict[str, Any], dir_stats: Dict[str, Any]):
         """Analyze directory organization patterns."""
-        for dir_path, stats in dir_stats.items():
-            if not dir_path:  # Skip root directory
-                continue
-                
-            # Analyze directory naming convention
-            dir_name = os.path.basename(dir_path)
-            if dir_name.islower():
-                pattern = 'lowercase'
-            elif dir_name.isupper():
-                pattern = 'uppercase'
-            elif '_' in dir_name:
-                pattern = 'snake_case'
-            elif '-' in dir_name:
-                pattern = 'kebab-case'
-            else:
-                pattern = 'mixed'
-                
-            # Analyze directory purpose
-            purpose = []
-            if any(x in dir_name.lower() for x in ['test', 'spec', 'mock']):
-                purpose.append('testing')
-            if any(x in dir_name.lower() for x in ['util', 'helper', 'common', 'shared']):
-                purpose.append('utilities')
-            if any(x in dir_name.lower() for x in ['model', 'entity', 'domain']):
-                purpose.append('domain')
-            if any(x in dir_name.lower() for x in ['controller', 'handler', 'service']):
-                purpose.append('business_logic')
-            if any(x in dir_name.lower() for x in ['view', 'template', 'component']):
-                purpose.append('presentation')
-                
-            # Add directory pattern
-            structure['patterns']['directory_patterns'].append({
-                'path': dir_path,
-                'name_pattern': pattern,
-                'purpose': purpose,
-                'languages': stats['languages'],
-                'total_files': stats['total_files'],
-                'code_files': stats['code_files'],
-                'code_metrics': stats['patterns']
-            })
-
-    def _generate_ai_rules(self, project_info: Dict[str, Any]) -> Dict[str, Any]:
+        # 命名约定和用途由 analyzers 中带缓存的单次扫描分类器判定，结果与原先逐类 any() 扫描一致
+        analyze_directory_patterns(structure, dir_stats)
+
+    def _generate_ai_rules(self, project_info: Dict[str, Any], project_structure: Dict[str, Any], force_refresh: bool = False) -> Dict[str, Any]:
         """Generate rules using Gemini AI based on project analysis."""
         try:
-            # Analyze project
-            project_structure = self._analyze_project_structure()
-            
             # 使用导入的 prompt 模板
             prompt = get_ai_rules_prompt(project_info, project_structure)
-    
+            
+            # 相同模型、相同 prompt 的响应直接从本地缓存读取
+            cache_key = hashlib.sha256(f"{self.model_name}\n{prompt}".encode('utf-8')).hexdigest()
+            response_text = None if force_refresh else _response_cache_get(cache_key)
+            from_cache = response_text is not None
+            
             # Get AI response
-            response = self.chat_session.send_message(prompt)
+            if from_cache:
+                print("✅ 使用缓存的 AI 响应")
+            else:
+                response_text = self._send_streaming(prompt)
             
             # Extract JSON
-            json_match = re.search(r'({[\s\S]*})', response.text)
-            if not json_match:
+            json_str = _extract_json(response_text)
+            if json_str is None:
                 print("⚠️ No JSON found in AI response")
                 raise ValueError("Invalid AI response format")
-                
-            json_str = json_match.group(1)
             
             try:
-                ai_rules = json.loads(json_str)
+                ai_rules = _json_loads(json_str)
                 
                 if not isinstance(ai_rules, dict) or 'ai_behavior' not in ai_rules:
                     print("⚠️ Invalid JSON structure in AI response")
                     raise ValueError("Invalid AI rules structure")
-                    
+                
+                # 只缓存能解析出规则的响应
+                if not from_cache:
+                    _response_cache_put(cache_key, response_text)
                 return ai_rules
                 
             except json.JSONDecodeError as e:
@@ -339,77 +758,56 @@ class RulesGenerator:
             print(f"⚠️ Error generating AI rules: {e}")
             raise
 
-    def _generate_project_description(self, project_structure: Dict[str, Any]) -> str:
-        """Generate project description using AI based on project analysis."""
-        try:
-            # Analyze core modules
-            core_modules = []
-            for file in project_structure.get('files', []):
-                if file.endswith('.py') and not any(x in file.lower() for x in ['setup', 'config', 'test']):
-                    module_info = {
-                        'name': file,
-                        'classes': [c for c in project_structure['patterns']['class_patterns'] if c['file'] == file],
-                        'functions': [f for f in project_structure['patterns']['function_patterns'] if f['file'] == file],
-                        'imports': [imp for imp in project_structure['patterns']['imports'] if imp in file]
-                    }
-                    core_modules.append(module_info)
-
-            # Analyze main patterns
-            main_patterns = {
-                'error_handling': project_structure.get('patterns', {}).get('error_patterns', []),
-                'performance': project_structure.get('patterns', {}).get('performance_patterns', []),
-                'code_organization': project_structure.get('patterns', {}).get('code_organization', [])
-            }
-
-            # Create detailed prompt for AI
-            prompt = f"""Analyze this project structure and create a detailed description (2-3 sentences) that captures its essence:
-
-Project Overview:
-1. Core Modules Analysis:
-{chr(10).join([f"- {m['name']}: {len(m['classes'])} classes, {len(m['functions'])} functions" for m in core_modules])}
-
-2. Module Responsibilities:
-{chr(10).join([f"- {m['name']}: Main purpose indicated by {', '.join([c['name'] for c in m['classes'][:2]])}" for m in core_modules if m['classes']])}
-
-3. Technical Implementation:
-- Error Handling: {len(main_patterns['error_handling'])} patterns found
-- Performance Optimizations: {len(main_patterns['performance'])} patterns found
-- Code Organization: {len(main_patterns['code_organization'])} patterns found
-
-4. Project Architecture:
-- Total Files: {len(project_structure.get('files', []))}
-- Core Python Modules: {len(core_modules)}
-- External Dependencies: {len(project_structure.get('dependencies', {}))}
-
-Based on this analysis, create a description that covers:
-1. The project's main purpose and functionality
-2. Key technical features and implementation approach
-3. Target users and primary use cases
-4. Unique characteristics or innovations
-
-Format: Return a clear, concise description focusing on what makes this project unique.
-Do not include technical metrics in the description."""
-
-            # Get AI response
-            response = self.chat_session.send_message(prompt)
-            description = response.text.strip()
-            
-            # Validate description length and content
-            if len(description.split()) > 100:  # Length limit
-                description = ' '.join(description.split()[:100]) + '...'
-            
-            return description
-            
-        except Exception as e:
-            print(f"⚠️ Error generating project description: {e}")
-            return "A software project with automated analysis and rule generation capabilities."
+    def _send_streaming(self, prompt: str) -> str:
+        """以流式方式发送 prompt，边接收边更新进度，返回到第一个完整 JSON 对象为止的响应文本
+        
+        每次都是独立的无状态请求：不使用聊天会话，RulesWatcher 反复重新生成时
+        不会把之前的 prompt 和响应作为历史再次发送；因此收到完整的 JSON 对象后
+        即可停止读取，不必等待对象之后的说明文字
+        """
+        response = self.model.generate_content(prompt, stream=True)
+        chunks = []
+        with tqdm.tqdm(desc="接收 AI 响应", unit="chunk", disable=not _is_tty()) as pbar:
+            for chunk in response:
+                pbar.update(1)
+                # 被安全策略拦截或内容为空的分片没有 parts，访问 chunk.text 会抛出 ValueError；
+                # 没有候选结果时 chunk.parts 本身也会抛出，因此直接检查 candidates
+                if not (chunk.candidates and chunk.candidates[0].content.parts):
+                    continue
+                text = chunk.text
+                chunks.append(text)
+                # _extract_json 从第一个 '{' 开始配平，前缀中找到的对象与完整文本中的相同
+                if '}' in text and _extract_json("".join(chunks)) is not None:
+                    break
+        return "".join(chunks)
+
+    def _extract_project_description(self, ai_rules: Dict[str, Any]) -> str:
+        """Extract the project description returned together with the AI rules."""
+        description = ai_rules.get('description')
+        if not isinstance(description, str) or not description.strip():
+            print("⚠️ No project description in AI response")
+            return _DEFAULT_DESCRIPTION
+        # 先按字符数截断，失控的超长响应不会被整个切分成单词列表
+        truncated = len(description) > _MAX_DESCRIPTION_CHARS
+        description = description[:_MAX_DESCRIPTION_CHARS].strip()
+        
+        # Validate description length and content
+        words = description.split()
+        if truncated or len(words) > 100:  # Length limit
+            description = ' '.join(words[:100]) + '...'
+        
+        return description
 
     def _generate_markdown_rules(self, project_info: Dict[str, Any], ai_rules: Dict[str, Any]) -> str:
         """Generate rules in markdown format."""
         timestamp = self._get_timestamp()
-        description = project_info.get('description', 'A software project with automated analysis and rule generation capabilities.')
+        description = project_info.get('description', _DEFAULT_DESCRIPTION)
         
-        markdown = f"""# Project Rules
+        code_generation = ai_rules['ai_behavior']['code_generation']
+        module_organization = code_generation['module_organization']
+        
+        # 各段落追加到 parts，最后一次性 join，避免反复拼接越来越长的字符串
+        parts = [f"""# Project Rules
 
 ## Project Information
 - **Version**: {project_info.get('version', '1.0')}
@@ -426,88 +824,104 @@ Do not include technical metrics in the description."""
 
 ### Code Generation Style
 #### Preferred Patterns
-"""
+"""]
         # Add preferred code generation patterns
-        for pattern in ai_rules['ai_behavior']['code_generation']['style']['prefer']:
-            markdown += f"- {pattern}\n"
-            
-        markdown += "\n#### Patterns to Avoid\n"
-        for pattern in ai_rules['ai_behavior']['code_generation']['style']['avoid']:
-            markdown += f"- {pattern}\n"
-            
-        markdown += "\n### Error Handling\n#### Preferred Patterns\n"
-        for pattern in ai_rules['ai_behavior']['code_generation']['error_handling']['prefer']:
-            markdown += f"- {pattern}\n"
-            
-        markdown += "\n#### Patterns to Avoid\n"
-        for pattern in ai_rules['ai_behavior']['code_generation']['error_handling']['avoid']:
-            markdown += f"- {pattern}\n"
-            
-        markdown += "\n### Performance\n#### Preferred Patterns\n"
-        for pattern in ai_rules['ai_behavior']['code_generation']['performance']['prefer']:
-            markdown += f"- {pattern}\n"
-            
-        markdown += "\n#### Patterns to Avoid\n"
-        for pattern in ai_rules['ai_behavior']['code_generation']['performance']['avoid']:
-            markdown += f"- {pattern}\n"
-            
-        markdown += "\n### Module Organization\n#### Structure\n"
-        for item in ai_rules['ai_behavior']['code_generation']['module_organization']['structure']:
-            markdown += f"- {item}\n"
-            
-        markdown += "\n#### Dependencies\n"
-        for dep in ai_rules['ai_behavior']['code_generation']['module_organization']['dependencies']:
-            markdown += f"- {dep}\n"
-            
-        markdown += "\n#### Module Responsibilities\n"
-        for module, resp in ai_rules['ai_behavior']['code_generation']['module_organization']['responsibilities'].items():
-            markdown += f"- **{module}**: {resp}\n"
-            
-        markdown += "\n#### Rules\n"
-        for rule in ai_rules['ai_behavior']['code_generation']['module_organization']['rules']:
-            markdown += f"- {rule}\n"
-            
-        markdown += "\n#### Naming Conventions\n"
-        for category, convention in ai_rules['ai_behavior']['code_generation']['module_organization']['naming'].items():
-            markdown += f"- **{category}**: {convention}\n"
-            
-        return markdown
+        parts.extend(f"- {pattern}\n" for pattern in code_generation['style']['prefer'])
+        
+        parts.append("\n#### Patterns to Avoid\n")
+        parts.extend(f"- {pattern}\n" for pattern in code_generation['style']['avoid'])
+        
+        parts.append("\n### Error Handling\n#### Preferred Patterns\n")
+        parts.extend(f"- {pattern}\n" for pattern in code_generation['error_handling']['prefer'])
+        
+        parts.append("\n#### Patterns to Avoid\n")
+        parts.extend(f"- {pattern}\n" for pattern in code_generation['error_handling']['avoid'])
+        
+        parts.append("\n### Performance\n#### Preferred Patterns\n")
+        parts.extend(f"- {pattern}\n" for pattern in code_generation['performance']['prefer'])
+        
+        parts.append("\n#### Patterns to Avoid\n")
+        parts.extend(f"- {pattern}\n" for pattern in code_generation['performance']['avoid'])
+        
+        parts.append("\n### Module Organization\n#### Structure\n")
+        parts.extend(f"- {item}\n" for item in module_organization['structure'])
+        
+        parts.append("\n#### Dependencies\n")
+        parts.extend(f"- {dep}\n" for dep in module_organization['dependencies'])
+        
+        parts.append("\n#### Module Responsibilities\n")
+        parts.extend(f"- **{module}**: {resp}\n" for module, resp in module_organization['responsibilities'].items())
+        
+        parts.append("\n#### Rules\n")
+        parts.extend(f"- {rule}\n" for rule in module_organization['rules'])
+        
+        parts.append("\n#### Naming Conventions\n")
+        parts.extend(f"- **{category}**: {convention}\n" for category, convention in module_organization['naming'].items())
+        
+        return "".join(parts)
+
+    def _generation_hash(self, project_structure: Dict[str, Any], project_info: Dict[str, Any], format: str, compact: bool) -> str:
+        """计算决定规则文件内容的全部输入的摘要（须在写入 AI 生成的描述之前计算）
+
+        包括模型名和 prompt 模板版本：换用模型或修改 prompt 后需要重新生成
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{_RULES_META_VERSION}\n{PROMPT_VERSION}\n{self.model_name}\n{format.lower()}\n{compact}\n{project_structure['content_hash']}\n".encode('utf-8'))
+        digest.update(json.dumps(project_info, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read_generation_hash(meta_file: str):
+        """读取上次生成规则时记录的摘要；没有记录或无法读取时返回 None"""
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('content_hash')
+        except Exception:
+            return None
 
     @with_progress("生成规则文件")
-    def generate_rules_file(self, project_info: Dict[str, Any] = None, format: str = 'json') -> str:
-        """生成 .cursorrules 文件"""
+    def generate_rules_file(self, project_info: Dict[str, Any] = None, format: str = 'json', compact: bool = False, force_refresh: bool = False) -> str:
+        """生成 .cursorrules 文件；compact 为 True 时 JSON 格式不缩进，文件更小；
+        force_refresh 为 True 时忽略本地缓存，总是重新请求 AI"""
         try:
-            with tqdm.tqdm(total=5, desc="生成进度") as pbar:
+            with tqdm.tqdm(total=5, desc="生成进度", disable=not _is_tty()) as pbar:
                 # 使用分析器如果没有提供 project_info
                 if project_info is None:
-                    print("📊 分析项目信息...")
+                    _report_step(pbar, "📊 分析项目信息")
                     project_info = self.analyzer.analyze_project_for_rules()
                 pbar.update(1)
                 
-                # 分析项目结构
-                print("🔍 分析项目结构...")
+                # 分析项目结构；本次生成只遍历一次，结果供 AI 规则和项目描述共用。
+                # 不缓存到实例上：RulesWatcher 会复用同一实例在文件变化后重新生成
+                _report_step(pbar, "🔍 分析项目结构")
                 project_structure = self._analyze_project_structure()
                 pbar.update(1)
                 
-                # 生成 AI 规则
-                print("🤖 生成 AI 规则...")
-                ai_rules = self._generate_ai_rules(project_info)
+                # 项目内容、项目信息和输出格式都未变化时沿用现有规则文件，不再请求 AI
+                rules_file = os.path.join(self.project_path, '.cursorrules')
+                meta_file = _cache_file_for(_RULES_META_DIR, rules_file)
+                generation_hash = self._generation_hash(project_structure, project_info, format, compact)
+                if not force_refresh and os.path.exists(rules_file) and self._read_generation_hash(meta_file) == generation_hash:
+                    print("✅ 项目未变化，沿用现有规则文件")
+                    pbar.update(pbar.total - pbar.n)
+                    return rules_file
+                
+                # 生成 AI 规则；项目描述在同一次请求中返回
+                _report_step(pbar, "🤖 生成 AI 规则")
+                ai_rules = self._generate_ai_rules(project_info, project_structure, force_refresh)
                 pbar.update(1)
                 
                 # 生成项目描述
-                print("📝 生成项目描述...")
-                description = self._generate_project_description(project_structure)
+                _report_step(pbar, "📝 生成项目描述")
+                description = self._extract_project_description(ai_rules)
                 project_info['description'] = description
                 pbar.update(1)
                 
                 # 创建规则文件
-                print("💾 保存规则文件...")
-                rules_file = os.path.join(self.project_path, '.cursorrules')
+                _report_step(pbar, "💾 保存规则文件")
                 
                 if format.lower() == 'markdown':
                     content = self._generate_markdown_rules(project_info, ai_rules)
-                    with open(rules_file, 'w', encoding='utf-8') as f:
-                        f.write(content)
                 else:  # JSON format
                     rules = {
                         "version": "1.0",
@@ -518,8 +932,14 @@ Do not include technical metrics in the description."""
                         },
                         "ai_behavior": ai_rules['ai_behavior']
                     }
-                    with open(rules_file, 'w', encoding='utf-8') as f:
-                        json.dump(rules, f, indent=2, ensure_ascii=False)
+                    content = _json_dumps(rules, compact)
+                # 原子替换：Cursor 或 RulesWatcher 不会读到写了一半的规则文件
+                _write_atomic(rules_file, content)
+                try:
+                    os.makedirs(_RULES_META_DIR, exist_ok=True)
+                    _write_atomic(meta_file, json.dumps({'content_hash': generation_hash}))
+                except Exception as e:
+                    print(f"⚠️ 写入规则元数据失败: {e}")
                 pbar.update(1)
                 
                 print(f"\n✅ 规则文件已生成: {rules_file}")
@@ -531,117 +951,9 @@ Do not include technical metrics in the description."""
 
     def _analyze_web_patterns(self, content: str, rel_path: str, structure: Dict[str, Any]) -> None:
         """Analyze React/Next.js specific patterns."""
-        # Find interfaces and types
-        for match in self.compiled_patterns['common']['interface'].finditer(content):
-            structure['patterns']['class_patterns'].append({
-                'name': match.group(1),
-                'type': 'interface/type',
-                'inheritance': match.group(2).strip() if match.group(2) else '',
-                'file': rel_path
-            })
-
-        # Find React components
-        for match in self.compiled_patterns['common']['jsx_component'].finditer(content):
-            component_name = match.group(1)
-            if component_name[0].isupper():  # React components start with uppercase
-                structure['patterns']['class_patterns'].append({
-                    'name': component_name,
-                    'type': 'react_component',
-                    'file': rel_path
-                })
-
-        # Find React hooks
-        for hook in re.finditer(self.compiled_patterns['common']['react_hook'], content):
-            structure['patterns']['function_patterns'].append({
-                'name': hook.group(0),
-                'type': 'react_hook',
-                'file': rel_path
-            })
-
-        # Find Next.js specific patterns
-        if any(x in rel_path for x in ['pages/', 'app/']):
-            # Check for Next.js data fetching methods
-            for method in re.finditer(self.compiled_patterns['common']['next_api'], content):
-                structure['patterns']['function_patterns'].append({
-                    'name': method.group(0),
-                    'type': 'next_data_fetching',
-                    'file': rel_path
-                })
-
-            # Analyze page/route structure
-            page_match = re.search(self.compiled_patterns['common']['next_page'], rel_path)
-            if page_match:
-                structure['patterns']['code_organization'].append({
-                    'type': 'next_page',
-                    'route': page_match.group('route'),
-                    'nested': page_match.group('nested'),
-                    'file': rel_path
-                })
-
-            # Check for layouts
-            if re.search(self.compiled_patterns['common']['next_layout'], rel_path):
-                structure['patterns']['code_organization'].append({
-                    'type': 'next_layout',
-                    'file': rel_path
-                })
-
-        # Find styled-components patterns
-        for match in re.finditer(self.compiled_patterns['common']['styled_component'], content):
-            structure['patterns']['code_organization'].append({
-                'type': 'styled_component',
-                'element': match.group('element') if match.group('element') else 'css',
-                'file': rel_path
-            })
+        # 预编译模式和各结果列表在 analyzers 中绑定为局部变量，每个正则先做子串预检
+        analyze_web_patterns(content, rel_path, structure, self.compiled_patterns)
 
     def _analyze_unity_patterns(self, content: str, rel_path: str, structure: Dict[str, Any]) -> None:
         """Analyze Unity-specific patterns in C# scripts."""
-        # Find MonoBehaviour and ScriptableObject components
-        for match in self.compiled_patterns['unity']['component'].finditer(content):
-            structure['patterns']['class_patterns'].append({
-                'name': match.group(0),
-                'type': 'unity_component',
-                'file': rel_path
-            })
-
-        # Find Unity lifecycle methods
-        for match in self.compiled_patterns['unity']['lifecycle'].finditer(content):
-            structure['patterns']['function_patterns'].append({
-                'name': match.group(0),
-                'type': 'unity_lifecycle',
-                'file': rel_path
-            })
-
-        # Find Unity attributes
-        for match in self.compiled_patterns['unity']['attribute'].finditer(content):
-            structure['patterns']['code_organization'].append({
-                'type': 'unity_attribute',
-                'name': match.group(0),
-                'parameters': match.group('params') if match.group('params') else '',
-                'file': rel_path
-            })
-
-        # Find Unity types
-        for match in self.compiled_patterns['unity']['type'].finditer(content):
-            structure['patterns']['class_patterns'].append({
-                'name': match.group(0),
-                'type': 'unity_type',
-                'file': rel_path
-            })
-
-        # Find Unity events
-        for match in self.compiled_patterns['unity']['event'].finditer(content):
-            structure['patterns']['code_organization'].append({
-                'type': 'unity_event',
-                'event_type': match.group('type'),
-                'name': match.group('name'),
-                'file': rel_path
-            })
-
-        # Find Unity serialized fields
-        for match in self.compiled_patterns['unity']['field'].finditer(content):
-            structure['patterns']['code_organization'].append({
-                'type': 'unity_field',
-                'field_type': match.group(1),
-                'name': match.group(2),
-                'file': rel_path
-            })
+        analyze_unity_patterns(content, rel_path, structure, self.compiled_patterns)
@@ -0,0 +1,102 @@
+import types
+import unittest
+
+from analyzers import analyze_unity_patterns, analyze_web_patterns
+from patterns_analyzer import PatternsAnalyzer
+
+TSX_SOURCE = """\
+import styled from 'styled-components';
+
+export interface ButtonProps extends BaseProps { label: string }
+
+const Wrapper = styled.div`padding: 4px;`;
+
+export default function Page() {
+  const [count, setCount] = useState(0);
+  useEffect(() => {}, []);
+  return <Layout title="home"><Button label="x" /></Layout>;
+}
+
+export async function getServerSideProps() {
+  return { props: {} };
+}
+"""
+
+UNITY_SOURCE = """\
+using UnityEngine;
+using UnityEngine.Events;
+
+public class Player : MonoBehaviour {
+    [SerializeField] private float speed = 5f;
+    [Header("Events")]
+    public UnityEvent<int> onScore;
+    public int lives = 3;
+
+    void Start() {
+        GameObject target;
+    }
+
+    void Update() {}
+}
+"""
+
+
+def _empty_structure():
+    return {'patterns': {'class_patterns': [], 'function_patterns': [], 'code_organization': []}}
+
+
+def _types(records):
+    return {record['type'] for record in records}
+
+
+class WebAndUnityPatternsTest(unittest.TestCase):
+    """Run the web/Unity analyzers against the patterns RulesGenerator actually uses."""
+
+    def setUp(self):
+        self.compiled_patterns = PatternsAnalyzer().compiled_patterns
+
+    def test_web_patterns(self):
+        structure = _empty_structure()
+        analyze_web_patterns(TSX_SOURCE, 'src/pages/blog/index.tsx', structure, self.compiled_patterns)
+        patterns = structure['patterns']
+
+        self.assertIn({'name': 'ButtonProps', 'type': 'interface/type', 'inheritance': 'BaseProps', 'file': 'src/pages/blog/index.tsx'},
+                      patterns['class_patterns'])
+        self.assertEqual({'Layout'}, {r['name'] for r in patterns['class_patterns'] if r['type'] == 'react_component'})
+        self.assertEqual({'useState', 'useEffect'}, {r['name'] for r in patterns['function_patterns'] if r['type'] == 'react_hook'})
+        self.assertIn('next_data_fetching', _types(patterns['function_patterns']))
+
+        pages = [r for r in patterns['code_organization'] if r['type'] == 'next_page']
+        self.assertEqual([('blog/index', True)], [(r['route'], r['nested']) for r in pages])
+        self.assertIn('styled_component', _types(patterns['code_organization']))
+
+    def test_unity_patterns(self):
+        structure = _empty_structure()
+        analyze_unity_patterns(UNITY_SOURCE, 'Assets/Player.cs', structure, self.compiled_patterns)
+        patterns = structure['patterns']
+
+        self.assertIn('unity_component', _types(patterns['class_patterns']))
+        self.assertIn('unity_type', _types(patterns['class_patterns']))
+        self.assertEqual(2, sum(r['type'] == 'unity_lifecycle' for r in patterns['function_patterns']))
+
+        events = [r for r in patterns['code_organization'] if r['type'] == 'unity_event']
+        self.assertEqual([('int', 'onScore')], [(r['event_type'], r['name']) for r in events])
+        fields = {r['name']: r['field_type'] for r in patterns['code_organization'] if r['type'] == 'unity_field'}
+        self.assertEqual('int', fields.get('lives'))
+        self.assertIn('unity_attribute', _types(patterns['code_organization']))
+
+    def test_rules_generator_methods(self):
+        try:
+            from rules_generator import RulesGenerator
+        except ImportError as e:
+            self.skipTest(f"rules_generator dependencies not installed: {e}")
+        generator = types.SimpleNamespace(compiled_patterns=self.compiled_patterns)
+        structure = _empty_structure()
+        RulesGenerator._analyze_web_patterns(generator, TSX_SOURCE, 'app/page.tsx', structure)
+        RulesGenerator._analyze_unity_patterns(generator, UNITY_SOURCE, 'Assets/Player.cs', structure)
+        self.assertIn('react_hook', _types(structure['patterns']['function_patterns']))
+        self.assertIn('unity_event', _types(structure['patterns']['code_organization']))
+
+
+if __name__ == '__main__':
+    unittest.main()